@@ -0,0 +1,120 @@
+import os
+import time
+import uuid
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ExportJob:
+    """One export run: its state, progress and, once done, a file path or a URL."""
+
+    def __init__(self, key, kind, label=""):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.kind = kind
+        self.label = label
+        self.status = "queued"  # queued -> running -> done | failed
+        self.rows = 0
+        self.total = None
+        self.path = None
+        self.download_name = None
+        self.mimetype = None
+        self.url = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+
+    def count(self, docs):
+        """Pass documents through while counting them into `rows` for progress reporting."""
+        for doc in docs:
+            self.rows += 1
+            yield doc
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "label": self.label,
+            "status": self.status,
+            "rows": self.rows,
+            "total": self.total,
+            "error": self.error,
+            "url": self.url,
+            "has_file": self.status == "done" and self.path is not None,
+        }
+
+
+class ExportJobManager:
+    """
+    Runs exports on a small thread pool instead of inside the Flask request.
+
+    ▸ `submit(key, kind, work)` – returns the existing job for `key` if one is queued, running,
+      or finished and not yet expired; otherwise starts `work(job)` in the pool.
+    ▸ `work(job)` fills in `job.path` (a file under `artifact_dir`) or `job.url` and may
+      update `job.rows`/`job.total` as it goes. Set `job.path` before writing the file, so
+      a partial file from a failed job is deleted.
+    ▸ Finished jobs and their files are dropped `ttl` seconds after they complete.
+    """
+
+    def __init__(self, max_workers=2, artifact_dir=None, ttl=3600):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export")
+        self.artifact_dir = artifact_dir or tempfile.mkdtemp(prefix="propertybot_exports_")
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        self.ttl = ttl
+        self.jobs = {}
+        self.by_key = {}
+        self.lock = threading.Lock()
+
+    def artifact_path(self, job, extension) -> str:
+        return os.path.join(self.artifact_dir, f"{job.id}.{extension}")
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def submit(self, key, kind, work, label=""):
+        self.expire()
+        with self.lock:
+            existing = self.jobs.get(self.by_key.get(key))
+            if existing and existing.status != "failed":
+                return existing  # identical export already queued, running or ready
+            job = ExportJob(key, kind, label)
+            self.jobs[job.id] = job
+            self.by_key[key] = job.id
+        self.pool.submit(self._run, job, work)
+        return job
+
+    def _run(self, job, work):
+        job.status = "running"
+        started = time.monotonic()
+        try:
+            work(job)
+            job.status = "done"
+            logging.info(f"✅ Export {job.kind} {job.id[:8]}: {job.rows} rows in {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logging.error(f"❌ Export {job.kind} {job.id[:8]} failed: {e}")
+            self._remove_file(job)
+        finally:
+            job.finished = time.time()
+
+    def expire(self):
+        """Forget finished jobs older than `ttl` and delete their files."""
+        cutoff = time.time() - self.ttl
+        with self.lock:
+            stale = [job for job in self.jobs.values() if job.finished and job.finished < cutoff]
+            for job in stale:
+                del self.jobs[job.id]
+                if self.by_key.get(job.key) == job.id:
+                    del self.by_key[job.key]
+        for job in stale:
+            self._remove_file(job)
+
+    @staticmethod
+    def _remove_file(job):
+        if job.path and os.path.exists(job.path):
+            os.remove(job.path)
+        job.path = None
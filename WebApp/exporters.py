@@ -0,0 +1,138 @@
+import csv
+import zlib
+from io import StringIO
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+# Columns every export carries, in order; also the Mongo projection, so internal fields
+# (city_norm, content_hash, price_history, ...) never leave the database
+EXPORT_FIELDS = [
+    "_id", "website", "city", "category", "title", "price", "price_int", "location",
+    "bedrooms", "bathrooms", "toilets", "agent_name", "agent_whatsapp", "agent_call", "phone",
+    "image_url", "url", "date_scraped", "first_seen", "last_seen",
+]
+EXPORT_PROJECTION = {field: 1 for field in EXPORT_FIELDS}
+EXPORT_BATCH_SIZE = 1000  # documents per cursor round-trip
+CSV_FLUSH_ROWS = 500      # rows per chunk yielded to the client
+
+# format -> (file extension, mimetype)
+EXPORT_FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "csv_gz": ("csv.gz", "application/gzip"),
+    "excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+DATE_FIELDS = {"date_scraped", "first_seen", "last_seen"}
+PARQUET_SCHEMA = pa.schema([
+    (field, pa.int64() if field == "price_int" else pa.timestamp("ms") if field in DATE_FIELDS else pa.string())
+    for field in EXPORT_FIELDS
+])
+
+
+def export_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)  # ObjectId and anything else
+
+
+def native_cell(value):
+    """Cell for typed formats (XLSX): numbers and datetimes stay native, everything else is text."""
+    if value is None or isinstance(value, (str, int, float, bool, datetime)):
+        return value
+    return str(value)
+
+
+def export_row(doc, cell=export_cell) -> list:
+    return [cell(doc.get(field)) for field in EXPORT_FIELDS]
+
+
+def iter_csv(docs):
+    """Yield a CSV export chunk by chunk; memory stays flat however many documents `docs` yields."""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    rows = 0
+    for doc in docs:
+        writer.writerow(export_row(doc))
+        rows += 1
+        if rows % CSV_FLUSH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_csv_gz(docs):
+    """`iter_csv` compressed on the fly into a single gzip stream."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip header/trailer
+    for chunk in iter_csv(docs):
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def write_csv(docs, path, compress=False):
+    with open(path, "wb") as output:
+        for chunk in (iter_csv_gz(docs) if compress else iter_csv(docs)):
+            output.write(chunk if compress else chunk.encode("utf-8"))
+
+
+def write_xlsx(docs, path):
+    """XLSX built row by row with openpyxl's write-only mode, so rows never pile up in memory."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Listings")
+    sheet.append(EXPORT_FIELDS)
+    for doc in docs:
+        sheet.append(export_row(doc, cell=native_cell))
+    workbook.save(path)
+
+
+def _parquet_value(field, value):
+    if value is None:
+        return None
+    if field == "price_int":
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    if field in DATE_FIELDS:
+        return value if isinstance(value, datetime) else None
+    return str(value)
+
+
+def write_parquet(docs, path, batch_size=EXPORT_BATCH_SIZE):
+    """Parquet written one row group per `batch_size` documents."""
+    writer = pq.ParquetWriter(path, PARQUET_SCHEMA, compression="snappy")
+
+    def write(batch):
+        columns = {field: [_parquet_value(field, doc.get(field)) for doc in batch] for field in EXPORT_FIELDS}
+        writer.write_table(pa.Table.from_pydict(columns, schema=PARQUET_SCHEMA))
+
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            write(batch)
+            batch = []
+    if batch:
+        write(batch)
+    writer.close()
+
+
+def write_export(docs, file_format, path):
+    """Write `docs` to `path` in one of the EXPORT_FORMATS."""
+    if file_format == "excel":
+        write_xlsx(docs, path)
+    elif file_format == "parquet":
+        write_parquet(docs, path)
+    else:
+        write_csv(docs, path, compress=file_format == "csv_gz")
@@ -0,0 +1,91 @@
+import time
+import threading
+from collections import OrderedDict
+
+_CURRENT = object()  # `put` default: tag the entry with the generation at store time
+
+
+class ResultCache:
+    """
+    In-process LRU cache for query results, invalidated by the listings generation.
+
+    ▸ `max_entries` – least recently used entries are evicted past this size.
+    ▸ `ttl` – seconds an entry stays valid even if the generation never moves.
+    ▸ `generation` – callable returning the current data generation; entries stored
+      under an older generation are treated as misses.
+    """
+
+    def __init__(self, generation, max_entries=256, ttl=600):
+        self.generation = generation
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key):
+        generation = self.generation()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            value, stored_generation, expires = entry
+            if stored_generation != generation or time.monotonic() >= expires:
+                del self.entries[key]
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def put(self, key, value, generation=_CURRENT):
+        """Store `value`; pass the `generation` it was computed from if it may have moved since."""
+        if generation is _CURRENT:
+            generation = self.generation()
+        with self.lock:
+            self.entries[key] = (value, generation, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            # Read before computing: if an ingest lands mid-query, the result stays tagged with
+            # the older generation and is dropped on the next read
+            generation = self.generation()
+            value = compute()
+            self.put(key, value, generation)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class GenerationWatcher:
+    """Reads the listings generation counter from Mongo at most once per `check_interval` seconds."""
+
+    def __init__(self, meta_collection, doc_id, check_interval=5):
+        self.meta = meta_collection
+        self.doc_id = doc_id
+        self.check_interval = check_interval
+        self.value = None
+        self.checked = 0.0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            if time.monotonic() - self.checked < self.check_interval:
+                return self.value
+            self.checked = time.monotonic()
+        try:
+            doc = self.meta.find_one({"_id": self.doc_id}, {"value": 1})
+            value = doc.get("value", 0) if doc else 0
+        except Exception:
+            value = None  # Mongo unreachable: entries from a known generation stop matching
+        with self.lock:
+            self.value = value
+        return value
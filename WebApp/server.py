@@ -1,11 +1,18 @@
-from flask import Flask, render_template, request, send_file, session, redirect, url_for
+from flask import Flask, abort, jsonify, render_template, request, send_file, session, redirect, url_for
 from datetime import datetime, timedelta, timezone
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from bson import ObjectId
 from dotenv import load_dotenv
-from io import BytesIO, StringIO
-import pandas as pd
 import os
 import json
+import base64
+import hashlib
+from itertools import chain
+
+from result_cache import ResultCache, GenerationWatcher
+from exporters import EXPORT_FIELDS, EXPORT_FORMATS, EXPORT_PROJECTION, EXPORT_BATCH_SIZE, export_row, write_export
+from export_jobs import ExportJobManager
+from sheets_export import append_rows, execute_with_backoff
 
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
@@ -23,11 +30,40 @@ client = MongoClient("mongodb://localhost:27017/")
 db = client["PropertyBot"]
 collection = db["listings"]
 
+# Query result cache, invalidated when the scrapers bump the listings generation
+# (pipelines.mongodb_pipeline.META_COLLECTION / LISTINGS_GENERATION_ID)
+listings_generation = GenerationWatcher(db["meta"], "listings_generation",
+                                        check_interval=float(os.getenv("GENERATION_CHECK_SECONDS", "5")))
+result_cache = ResultCache(listings_generation,
+                           max_entries=int(os.getenv("RESULT_CACHE_SIZE", "256")),
+                           ttl=float(os.getenv("RESULT_CACHE_TTL", "600")))
+
+# Price statistics precomputed by pipelines.rollups.PriceRollups after every ingest
+price_rollups = db["price_rollups"]
+STATS_DIMENSIONS = ("city", "category", "bedrooms", "website", "month")
+
+# Listing counts per city/category/website/day, kept current on ingest by pipelines.facets.FacetSummary
+listing_facets = db["listing_facets"]
+FACET_LIMIT = 50
+DATE_RANGES = ("today", "this_week", "last_7_days", "this_month", "since_january")
+
+# Downloads and Sheets exports run here, off the request thread; the browser polls for status
+export_jobs = ExportJobManager(max_workers=int(os.getenv("EXPORT_WORKERS", "2")),
+                               artifact_dir=os.getenv("EXPORT_DIR") or None,
+                               ttl=float(os.getenv("EXPORT_JOB_TTL", "3600")))
+
 # Google Sheets scopes
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive.file"]
+SHEETS_CHUNK_ROWS = int(os.getenv("SHEETS_EXPORT_CHUNK_ROWS", "2000"))  # rows per values().append request
 
 
 # ----------------------------- Helpers -----------------------------
+def normalize_facet(value):
+    # Copy of pipelines.mongodb_pipeline.normalize_facet, which fills `city_norm`/`category_norm`
+    # (the app runs from WebApp/); tests/test_normalize_facet.py keeps the two in step
+    return str(value or "").strip().lower()
+
+
 def get_scraped_after_from_range(range_value):
     now = datetime.now(timezone.utc)
     if range_value == "today":
@@ -43,6 +79,23 @@ def get_scraped_after_from_range(range_value):
     return None
 
 
+def filter_key(args):
+    """Normalized, hashable form of the filters, so equivalent requests share cache entries."""
+    def as_int(name):
+        try:
+            return int(args.get(name, ""))
+        except (ValueError, TypeError):
+            return None
+
+    return (
+        as_int("price_min"),
+        as_int("price_max"),
+        normalize_facet(args.get("city")),
+        normalize_facet(args.get("category")),
+        args.get("scraped_after_range") or "",
+    )
+
+
 def build_query_from_filters(args):
     query = {}
 
@@ -65,10 +118,11 @@ def build_query_from_filters(args):
         query["price_int"] = {"$gte": price_min}
     if price_max is not None:
         query.setdefault("price_int", {})["$lte"] = price_max
+    # Exact matches on the normalized fields so the compound indexes apply
     if city:
-        query["city"] = {"$regex": f"^{city}$", "$options": "i"}
+        query["city_norm"] = normalize_facet(city)
     if category:
-        query["category"] = {"$regex": f"^{category}$", "$options": "i"}
+        query["category_norm"] = normalize_facet(category)
 
     scraped_after = get_scraped_after_from_range(scraped_after_range)
     if scraped_after:
@@ -77,65 +131,217 @@ def build_query_from_filters(args):
     return query
 
 
-def listings_to_dataframe(listings):
-    for l in listings:
-        l["_id"] = str(l["_id"])
-    return pd.DataFrame(listings)
+# ----------------------------- Facets -----------------------------
+def day_start(moment):
+    """UTC midnight of `moment` as a naive datetime, the form facet rows store their `day` in."""
+    return moment.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+
+
+def facet_match(args, skip=None):
+    """Facet rows matching the current filters, except the one being counted (`skip`)."""
+    match = {"count": {"$gt": 0}}
+    city = normalize_facet(args.get("city"))
+    category = normalize_facet(args.get("category"))
+    scraped_after = get_scraped_after_from_range(args.get("scraped_after_range"))
+    if city and skip != "city":
+        match["city_norm"] = city
+    if category and skip != "category":
+        match["category_norm"] = category
+    if scraped_after and skip != "date":
+        match["day"] = {"$gte": day_start(scraped_after)}
+    return match
+
+
+def compute_facets(args):
+    """
+    Cities, categories and websites with listing counts, plus a count per date range, for the
+    current filters - one aggregation over the small summary collection, none over listings.
+    The price range is not part of the summary, so counts ignore it.
+    """
+    def top(field, skip, label=None):
+        group = {"_id": f"${field}", "count": {"$sum": "$count"}}
+        if label:
+            group["label"] = {"$last": f"${label}"}
+        return [{"$match": facet_match(args, skip)}, {"$group": group},
+                {"$sort": {"count": -1}}, {"$limit": FACET_LIMIT}]
+
+    result = next(listing_facets.aggregate([{"$facet": {
+        "city": top("city_norm", "city", label="city"),
+        "category": top("category_norm", "category", label="category"),
+        "website": top("website", None),
+        "days": [{"$match": facet_match(args, "date")}, {"$group": {"_id": "$day", "count": {"$sum": "$count"}}}],
+    }}]), {})
+
+    def values(rows):
+        return [{"value": row.get("label") or row["_id"], "count": row["count"]} for row in rows if row["_id"]]
+
+    days = result.get("days", [])
+    return {
+        "city": values(result.get("city", [])),
+        "category": values(result.get("category", [])),
+        "website": values(result.get("website", [])),
+        "scraped_after_range": {
+            name: sum(row["count"] for row in days if row["_id"] >= day_start(get_scraped_after_from_range(name)))
+            for name in DATE_RANGES
+        },
+    }
+
+
+def cached_facets(args):
+    # Facets ignore the price range, so those filters share one entry
+    return result_cache.get_or_compute(("facets", filter_key(args)[2:]), lambda: compute_facets(args))
+
+
+# ----------------------------- Keyset pagination -----------------------------
+PER_PAGE = 100
+PAGING_ARGS = ("cursor", "page")
+
+
+def encode_cursor(listing, direction, page):
+    """Opaque token pointing just past (`next`) or before (`prev`) `listing` in (price_int, _id) order."""
+    payload = {"p": listing.get("price_int"), "i": str(listing["_id"]), "d": direction, "n": page}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(token):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return payload["p"], ObjectId(payload["i"]), payload["d"], int(payload["n"])
+    except Exception:
+        return None
+
+
+def keyset_condition(price, oid, direction):
+    """Documents after/before (price, oid) in (price_int, _id) order; missing prices sort first."""
+    if direction == "next":
+        if price is None:
+            return {"$or": [{"price_int": None, "_id": {"$gt": oid}}, {"price_int": {"$type": "number"}}]}
+        return {"$or": [{"price_int": {"$gt": price}}, {"price_int": price, "_id": {"$gt": oid}}]}
+    if price is None:
+        return {"price_int": None, "_id": {"$lt": oid}}
+    return {"$or": [{"price_int": {"$lt": price}}, {"price_int": price, "_id": {"$lt": oid}},
+                    {"price_int": None}]}
+
+
+def fetch_page(query, token, per_page=PER_PAGE):
+    """One page of listings plus next/prev tokens; no skip(), so deep pages cost the same as page 1."""
+    cursor = decode_cursor(token) if token else None
+    order = ASCENDING
+    page = 1
+    if cursor:
+        price, oid, direction, page = cursor
+        query = {"$and": [query, keyset_condition(price, oid, direction)]}
+        order = ASCENDING if direction == "next" else DESCENDING
+
+    listings = list(collection.find(query).sort([("price_int", order), ("_id", order)]).limit(per_page + 1))
+    has_more = len(listings) > per_page
+    listings = listings[:per_page]
+    if order == DESCENDING:
+        listings.reverse()
+
+    going_back = cursor is not None and order == DESCENDING
+    has_next = has_more if not going_back else True
+    has_prev = page > 1 and (has_more if going_back else True)
+
+    next_token = encode_cursor(listings[-1], "next", page + 1) if listings and has_next else None
+    prev_token = encode_cursor(listings[0], "prev", page - 1) if listings and has_prev else None
+    return listings, page, next_token, prev_token
+
+
+def cached_count(query, key):
+    """Total for the page header: estimated for the full collection, cached per filter otherwise."""
+    if not query:
+        return collection.estimated_document_count()
+    return result_cache.get_or_compute(("count", key), lambda: collection.count_documents(query))
+
+
+def export_cursor(query):
+    """Cursor over the export columns only, fetched in batches in natural order."""
+    return collection.find(query, EXPORT_PROJECTION).batch_size(EXPORT_BATCH_SIZE)
+
+
+# ----------------------------- Export jobs -----------------------------
+def run_file_export(job, filters, file_format):
+    query = build_query_from_filters(filters)
+    job.total = collection.count_documents(query)
+    if not job.total:
+        raise ValueError("No data available for export.")
+
+    extension, mimetype = EXPORT_FORMATS[file_format]
+    job.path = export_jobs.artifact_path(job, extension)  # set first so a failed write is cleaned up
+    write_export(job.count(export_cursor(query)), file_format, job.path)
+    job.mimetype = mimetype
+    job.download_name = f"property_data_{datetime.now().strftime('%Y-%m-%d_%H-%M')}.{extension}"
+
+
+def run_sheets_export(job, creds, filters):
+    """Create a sheet and fill it from the cursor in fixed-size appends; memory stays at one chunk."""
+    service = build("sheets", "v4", credentials=creds)
+
+    query = build_query_from_filters(filters)
+    job.total = collection.count_documents(query)
+    if not job.total:
+        raise ValueError("No listings matched your filters.")
+
+    now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
+    spreadsheet = execute_with_backoff(service.spreadsheets().create(
+        body={
+            "properties": {
+                "title": f"Property Listings {now_str}"
+            }
+        }
+    ))
+    sheet_id = spreadsheet["spreadsheetId"]
+
+    rows = chain([EXPORT_FIELDS], (export_row(doc) for doc in export_cursor(query)))
+    append_rows(service, sheet_id, rows, chunk_size=SHEETS_CHUNK_ROWS,
+                on_progress=lambda written: setattr(job, "rows", max(written - 1, 0)))  # minus the header
+
+    job.url = f"https://docs.google.com/spreadsheets/d/{sheet_id}"
 
 
 # ----------------------------- Routes -----------------------------
 @app.route("/")
 def home():
-    page = max(request.args.get("page", 1, type=int), 1)
-    per_page = 100
     query = build_query_from_filters(request.args)
+    filters = {k: v for k, v in request.args.items() if k not in PAGING_ARGS}
+    key = filter_key(request.args)
+    token = request.args.get("cursor")
 
-    total_count = collection.count_documents(query)
-    total_pages = (total_count + per_page - 1) // per_page
-    skip = (page - 1) * per_page
-
-    listings = list(collection.find(query).skip(skip).limit(per_page).sort("price_int", 1))
+    listings, page, next_token, prev_token = result_cache.get_or_compute(
+        ("page", key, token), lambda: fetch_page(query, token))
+    total_count = cached_count(query, key)
+    total_pages = max((total_count + PER_PAGE - 1) // PER_PAGE, 1)
 
     return render_template("search.html",
                            listings=listings,
                            page=page,
                            total_pages=total_pages,
-                           filters=request.args)
+                           next_cursor=next_token,
+                           prev_cursor=prev_token,
+                           facets=cached_facets(request.args),
+                           filters=filters)
 
 
 @app.route("/download")
 def download():
     file_format = request.args.get("format", default="csv")
-    query = build_query_from_filters(request.args)
-    listings = list(collection.find(query))
-
-    if not listings:
-        return "No data available for export."
-
-    df = listings_to_dataframe(listings)
-    now_str = datetime.now().strftime("%Y-%m-%d_%H-%M")
-
-    if file_format == "excel":
-        output = BytesIO()
-        df.to_excel(output, index=False)
-        output.seek(0)
-        return send_file(output,
-                         download_name=f"property_data_{now_str}.xlsx",
-                         as_attachment=True,
-                         mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-
-    elif file_format == "sheets":
+    if file_format == "sheets":
         session["filters"] = request.args.to_dict()
         return redirect(url_for("authorize_google"))
 
-    else:
-        output = StringIO()
-        df.to_csv(output, index=False)
-        output.seek(0)
-        return send_file(BytesIO(output.getvalue().encode()),
-                         download_name=f"property_data_{now_str}.csv",
-                         as_attachment=True,
-                         mimetype="text/csv")
+    if file_format not in EXPORT_FORMATS:
+        file_format = "csv"
+
+    filters = request.args.to_dict()
+    if collection.find_one(build_query_from_filters(filters), {"_id": 1}) is None:
+        return "No data available for export."
+
+    # Same format + filters + data generation = same file: concurrent requests share one job
+    key = ("file", file_format, filter_key(filters), listings_generation())
+    job = export_jobs.submit(key, file_format, lambda job: run_file_export(job, filters, file_format),
+                             label=f"Property data export (.{EXPORT_FORMATS[file_format][0]})")
+    return redirect(url_for("export_status", job_id=job.id))
 
 
 # ----------------------------- Google OAuth -----------------------------
@@ -177,47 +383,59 @@ def export_to_sheets():
         return redirect(url_for("authorize_google"))
 
     creds = Credentials(**session["credentials"])
-    service = build("sheets", "v4", credentials=creds)
-
     filters = session.get("filters", {})
-    query = build_query_from_filters(filters)
-    listings = list(collection.find(query))
 
-    if not listings:
-        return "No listings matched your filters."
+    # Sheets are created in the user's Drive, so only that user's identical requests coalesce
+    account = hashlib.sha1(str(session["credentials"].get("refresh_token") or creds.token).encode()).hexdigest()
+    key = ("sheets", account, filter_key(filters), listings_generation())
+    job = export_jobs.submit(key, "sheets", lambda job: run_sheets_export(job, creds, filters),
+                             label="Google Sheets export")
+    return redirect(url_for("export_status", job_id=job.id))
 
-    df = listings_to_dataframe(listings)
 
-    df = df.fillna("")
+@app.route("/api/facets")
+def facets():
+    return jsonify(cached_facets(request.args))
 
 
-    # Convert all datetime-like columns to string to avoid serialization error
-    for col in df.columns:
-        if pd.api.types.is_datetime64_any_dtype(df[col]):
-            df[col] = df[col].astype(str)
+@app.route("/api/stats")
+def stats_dimensions():
+    return jsonify({"dimensions": list(STATS_DIMENSIONS)})
 
-    values = [df.columns.tolist()] + df.values.tolist()
 
+@app.route("/api/stats/<dimension>")
+def price_stats(dimension):
+    """Count and min/mean/median/percentiles/max of `price_int` per group, read from the rollups."""
+    if dimension not in STATS_DIMENSIONS:
+        abort(404)
+    query = {"dimension": dimension}
+    value = request.args.get("value")
+    if value:
+        query["value"] = normalize_facet(value) if dimension in ("city", "category") else value.strip()
+    limit = request.args.get("limit", 100, type=int)
 
-    now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
-    spreadsheet = service.spreadsheets().create(
-        body={
-            "properties": {
-                "title": f"Property Listings {now_str}"
-            }
-        }
-    ).execute()
+    groups = list(price_rollups.find(query, {"_id": 0, "dimension": 0}).sort("count", DESCENDING).limit(limit))
+    return jsonify({"dimension": dimension, "groups": groups})
 
-    sheet_id = spreadsheet["spreadsheetId"]
-    service.spreadsheets().values().update(
-        spreadsheetId=sheet_id,
-        range="Sheet1!A1",
-        valueInputOption="RAW",
-        body={"values": values}
-    ).execute()
-
-    sheet_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}"
-    return redirect(sheet_url)
+
+@app.route("/exports/<job_id>")
+def export_status(job_id):
+    job = export_jobs.get(job_id) or abort(404)
+    return render_template("export_status.html", job=job)
+
+
+@app.route("/exports/<job_id>/status")
+def export_status_json(job_id):
+    job = export_jobs.get(job_id) or abort(404)
+    return jsonify(job.to_dict())
+
+
+@app.route("/exports/<job_id>/file")
+def export_file(job_id):
+    job = export_jobs.get(job_id) or abort(404)
+    if job.status != "done" or not job.path:
+        abort(404)
+    return send_file(job.path, download_name=job.download_name, as_attachment=True, mimetype=job.mimetype)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,47 @@
+import os
+import sys
+
+# The web app runs from WebApp/; the Sheets retry queue is shared with the scrapers in utils/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.sheets_write_queue import SheetsWriteQueue
+
+
+def execute_with_backoff(request, queue=None):
+    """Execute a Sheets API request through `queue`, paced and retried on quota and server errors."""
+    return (queue or SheetsWriteQueue()).call(request.execute)
+
+
+def chunked(rows, size):
+    """Group an iterable of rows into lists of at most `size` without materializing it."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def append_rows(service, spreadsheet_id, rows, chunk_size=2000, sheet="Sheet1", on_progress=None):
+    """
+    Append `rows` to `sheet` one `values().append` request per chunk.
+
+    ▸ `rows` can be any iterable (e.g. a Mongo cursor mapped to lists) - only one chunk is held at a time.
+    ▸ `on_progress(rows_written)` is called after every chunk.
+    """
+    written = 0
+    queue = SheetsWriteQueue(chunk_size=chunk_size)
+    values = service.spreadsheets().values()
+    for chunk in chunked(rows, chunk_size):
+        execute_with_backoff(values.append(
+            spreadsheetId=spreadsheet_id,
+            range=f"{sheet}!A1",
+            valueInputOption="RAW",
+            insertDataOption="INSERT_ROWS",
+            body={"values": chunk},
+        ), queue)
+        written += len(chunk)
+        if on_progress:
+            on_progress(written)
+    return written
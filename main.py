@@ -1,30 +1,94 @@
+import sys
+import time
 import argparse
-import subprocess
+import importlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-def run_module(module_name):
-    subprocess.run(["python", "-m", f"scrapers.{module_name}"], check=True)
+SCRAPERS = {
+    "scraper1": "PROPERTYBOT_SCRAPER_1",
+    "scraper2": "PROPERTYBOT_SCRAPER_2",
+    "scraper3": "PROPERTYBOT_SCRAPER_3",
+}
 
-def run_all():
-    # REDACTED: Add all scrapers here
-    run_module("SCRAPER_1")
-    run_module("SCRAPER_2")
-    run_module("SCRAPER_3")
+def run_module(module_name, **options):
+    """Run one scraper module in this process and return its run report."""
+    module = importlib.import_module(f"scrapers.{module_name}")
+    return module.run(**options)
+
+def enqueue_module(module_name):
+    """Push one scraper's targets into the shared Mongo work queue."""
+    from scrapers.runner import enqueue_site
+    module = importlib.import_module(f"scrapers.{module_name}")
+    return enqueue_site(module.SITE)
+
+def run_scrapers(names, workers, write_sheet=True, **options):
+    """
+    Run scrapers in a process pool; a crashed scraper is reported, not raised.
+    The workers only scrape: their listings come back with the reports and are synced to
+    the Google Sheet here, one website at a time, once the pool has drained.
+    """
+    from scrapers.runner import sync_sheets
+    reports = {}
+    with ProcessPoolExecutor(max_workers=min(workers, len(names))) as pool:
+        futures = {pool.submit(run_module, SCRAPERS[name], write_sheet=False, keep_listings=write_sheet, **options): name
+                   for name in names}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                report = future.result()
+                report["status"] = "partial" if report["errors"] else "ok"
+            except BaseException as e:
+                report = {"site": name, "status": "failed", "error": repr(e)}
+            reports[name] = report
+    reports = [reports[name] for name in names]
+    if write_sheet:
+        sync_sheets(reports)
+    return reports
+
+def print_report(reports, duration):
+    print("\n========== PropertyBot run report ==========")
+    for r in reports:
+        if r["status"] == "failed":
+            print(f"❌ {r['site']:<32} FAILED  {r['error']}")
+            continue
+        icon = "✅" if r["status"] == "ok" else "⚠️"
+        print(f"{icon} {r['site']:<32} {r['items']:>6} items  {r['errors']:>3} errors  "
+              f"{r['duration_s']:>7}s  {r['bytes_fetched'] / 1_048_576:>7.1f} MB  {r['pipeline']}")
+    total = sum(r.get("items", 0) for r in reports)
+    print(f"Total: {total} items in {duration:.1f}s")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run PropertyBot demo scrapers via modules.")
     parser.add_argument(
         "script",
-        choices=["scraper1", "scraper2", "scraper3", "all"],
+        choices=[*SCRAPERS, "all"],
         help="Which scraper to run"
     )
+    parser.add_argument("--workers", type=int, default=len(SCRAPERS),
+                        help="Scraper processes to run at the same time (default: one per scraper)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Ignore checkpoints from an interrupted run and start from scratch")
+    parser.add_argument("--no-sheets", action="store_true",
+                        help="Scrape to MongoDB only; never authenticate with Google Sheets")
+    queue_mode = parser.add_mutually_exclusive_group()
+    queue_mode.add_argument("--enqueue", action="store_true",
+                            help="Producer: put the scrapers' targets in the shared Mongo work queue and exit")
+    queue_mode.add_argument("--from-queue", action="store_true",
+                            help="Worker: pull targets from the shared work queue (run on any number of machines)")
 
     args = parser.parse_args()
 
-    if args.script == "scraper1":
-        run_module("SCRAPER_1")
-    elif args.script == "scraper2":
-        run_module("SCRAPER_2")
-    elif args.script == "scraper3":
-        run_module("SCRAPER_3")
-    elif args.script == "all":
-        run_all()
+    names = list(SCRAPERS) if args.script == "all" else [args.script]
+
+    if args.enqueue:
+        for name in names:
+            print(f"📥 {name}: {enqueue_module(SCRAPERS[name])} targets enqueued")
+        sys.exit(0)
+
+    started = time.monotonic()
+    reports = run_scrapers(names, max(1, args.workers), fresh=args.fresh, from_queue=args.from_queue,
+                           write_sheet=not args.no_sheets)
+    print_report(reports, time.monotonic() - started)
+
+    # Non-zero exit if any scraper failed outright or lost targets along the way
+    sys.exit(0 if all(r["status"] == "ok" for r in reports) else 1)
@@ -0,0 +1,89 @@
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+# Statuses that mean "slow down" rather than "this page is broken"
+BACKOFF_STATUSES = {429, 503}
+
+
+@dataclass
+class _DomainSlot:
+    delay: float
+    next_at: float = 0.0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    responses: int = 0
+    backoffs: int = 0
+
+
+class AutoThrottle:
+    """
+    Per-domain request pacing driven by observed latency (AutoThrottle-style).
+
+    ▸ `target_concurrency` – average number of requests we want in flight per domain;
+      the delay converges to `latency / target_concurrency`.
+    ▸ `min_delay` / `max_delay` – bounds on the delay between request starts.
+    ▸ 429/503 responses and errors multiply the delay by `backoff_factor`; a
+      `Retry-After` header, if present, is honoured.
+    """
+
+    def __init__(self, target_concurrency=2.0, start_delay=1.0, min_delay=0.0, max_delay=30.0, backoff_factor=2.0):
+        self.target_concurrency = target_concurrency
+        self.start_delay = start_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.backoff_factor = backoff_factor
+        self.slots: dict[str, _DomainSlot] = {}
+
+    def _slot(self, url) -> _DomainSlot:
+        domain = urlparse(url).hostname or url
+        if domain not in self.slots:
+            self.slots[domain] = _DomainSlot(delay=self.start_delay)
+        return self.slots[domain]
+
+    def _clamp(self, delay) -> float:
+        return max(self.min_delay, min(self.max_delay, delay))
+
+    async def wait(self, url) -> None:
+        """Block until the domain's delay since the previous request start has passed."""
+        slot = self._slot(url)
+        async with slot.lock:
+            pause = slot.next_at - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            slot.next_at = time.monotonic() + slot.delay
+
+    def record(self, url, latency, status=None, retry_after=None) -> None:
+        """Feed back one response (`status=None` for a failed request)."""
+        slot = self._slot(url)
+        slot.responses += 1
+
+        if status is None or status in BACKOFF_STATUSES:
+            slot.backoffs += 1
+            delay = max(slot.delay * self.backoff_factor, latency / self.target_concurrency, 1.0)
+            if retry_after:
+                delay = max(delay, retry_after)
+            slot.delay = self._clamp(delay)
+            slot.next_at = max(slot.next_at, time.monotonic() + slot.delay)
+            logging.warning(f"🐢 Backing off {urlparse(url).hostname}: delay now {slot.delay:.1f}s (status {status}).")
+            return
+
+        target_delay = latency / self.target_concurrency
+        new_delay = (slot.delay + target_delay) / 2
+        # Non-200 responses come back fast and must not speed us up
+        if status != 200 and new_delay < slot.delay:
+            return
+        slot.delay = self._clamp(new_delay)
+
+    @property
+    def stats(self) -> dict:
+        return {domain: {"delay": round(slot.delay, 2), "responses": slot.responses, "backoffs": slot.backoffs}
+                for domain, slot in self.slots.items()}
+
+
+def parse_retry_after(value):
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
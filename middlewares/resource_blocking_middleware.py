@@ -0,0 +1,87 @@
+from collections import Counter
+from urllib.parse import urlparse
+
+# Third-party hosts that never carry listing data
+TRACKER_DOMAINS = [
+    "google-analytics.com", "googletagmanager.com", "googlesyndication.com", "doubleclick.net",
+    "adservice.google.com", "facebook.net", "connect.facebook.net", "criteo.com", "criteo.net",
+    "hotjar.com", "taboola.com", "outbrain.com", "scorecardresearch.com", "quantserve.com",
+    "tiktok.com", "clarity.ms", "onesignal.com", "adnxs.com", "amazon-adsystem.com",
+]
+
+# Rough transfer size per blocked request, used to estimate bandwidth saved
+TYPICAL_BYTES = {
+    "image": 60_000,
+    "media": 500_000,
+    "font": 40_000,
+    "stylesheet": 30_000,
+    "script": 50_000,
+    "other": 5_000,
+}
+
+BLOCKING_PROFILES = {
+    # Listing text, links and image URLs survive; the heavy assets and trackers don't
+    "default": {
+        "resource_types": {"image", "media", "font"},
+        "domains": TRACKER_DOMAINS,
+        "url_keywords": [],
+    },
+    # For sites whose data is plain HTML: also drop styling
+    "strict": {
+        "resource_types": {"image", "media", "font", "stylesheet"},
+        "domains": TRACKER_DOMAINS,
+        "url_keywords": [],
+    },
+    # Trackers only, for sites that break without their assets
+    "trackers": {
+        "resource_types": set(),
+        "domains": TRACKER_DOMAINS,
+        "url_keywords": [],
+    },
+}
+
+
+class ResourceBlockingMiddleware:
+    """
+    Route handler that aborts requests by resource type, domain or URL keyword.
+
+    Allowed requests fall back to the previously registered route (e.g. the
+    `RotatingUserAgentMiddleware`), so register this one last.
+    """
+
+    def __init__(self, profile="default", resource_types=None, domains=None, url_keywords=None):
+        config = BLOCKING_PROFILES[profile]
+        self.profile = profile
+        self.resource_types = set(config["resource_types"] if resource_types is None else resource_types)
+        self.domains = tuple(config["domains"] if domains is None else domains)
+        self.url_keywords = list(config["url_keywords"] if url_keywords is None else url_keywords)
+
+        self.allowed = 0
+        self.blocked = Counter()
+
+    def should_block(self, request) -> bool:
+        if request.resource_type in self.resource_types:
+            return True
+        host = urlparse(request.url).hostname or ""
+        if any(host == d or host.endswith("." + d) for d in self.domains):
+            return True
+        return any(k in request.url for k in self.url_keywords)
+
+    def __call__(self, route, request):
+        if self.should_block(request):
+            self.blocked[request.resource_type] += 1
+            return route.abort()
+        self.allowed += 1
+        return route.fallback()
+
+    @property
+    def stats(self) -> dict:
+        blocked = sum(self.blocked.values())
+        return {
+            "profile": self.profile,
+            "requests_allowed": self.allowed,
+            "requests_blocked": blocked,
+            "blocked_by_type": dict(self.blocked),
+            "est_bytes_saved": sum(TYPICAL_BYTES.get(t, TYPICAL_BYTES["other"]) * n
+                                   for t, n in self.blocked.items()),
+        }
@@ -38,4 +38,5 @@ class RotatingUserAgentMiddleware:
         headers = dict(request.headers)
         headers["User-Agent"] = user_agent
 
-        route.continue_(headers=headers)
\ No newline at end of file
+        # Returned so the async API can await it; the sync API returns None.
+        return route.continue_(headers=headers)
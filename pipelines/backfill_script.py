@@ -0,0 +1,10 @@
+from mongodb_pipeline import MongoPipeline
+
+def main():
+    pipeline = MongoPipeline()
+    pipeline.open()
+    pipeline.backfill_normalized_fields()
+    pipeline.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import logging
+from datetime import datetime
+
+
+class CheckpointStore:
+    """
+    Local SQLite record of crawl progress, one row per site/state/city/category target.
+    `site` is the crawler id (`SiteDefinition.name`), not the website label. Scrapers that
+    share a website still get separate rows and separate `reset`s.
+
+    A row holds the next page to crawl (`page`, `url`) or `done = 1` once the target's
+    last page has been written. A restarted run skips done targets and resumes the rest
+    from their cursor; `reset(site)` clears a site once a run completes cleanly.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("CHECKPOINT_DB", "crawl_checkpoints.sqlite")
+        self.conn = None
+
+    def open(self):
+        # Used from the crawl engine's I/O thread; the engine serializes every call
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                site TEXT NOT NULL,
+                target_key TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                done INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (site, target_key)
+            )
+        """)
+        self.conn.commit()
+        logging.info(f"📌 Checkpoint store ready at {self.path}.")
+
+    def resume(self, target):
+        """Return `target` advanced to its saved cursor, or None if it was already finished."""
+        row = self.conn.execute(
+            "SELECT page, url, done FROM checkpoints WHERE site = ? AND target_key = ?",
+            (target.site, target.key),
+        ).fetchone()
+        if row is None:
+            return target
+        page, url, done = row
+        if done:
+            return None
+        return target.at_page(page, url)
+
+    def _upsert(self, target, page, url, done):
+        self.conn.execute(
+            """
+            INSERT INTO checkpoints (site, target_key, page, url, done, updated_at) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (site, target_key) DO UPDATE
+            SET page = excluded.page, url = excluded.url, done = excluded.done, updated_at = excluded.updated_at
+            """,
+            (target.site, target.key, page, url, int(done), datetime.utcnow().isoformat()),
+        )
+        self.conn.commit()
+
+    def save_cursor(self, next_target):
+        self._upsert(next_target, next_target.page, next_target.url, done=False)
+
+    def mark_done(self, target):
+        self._upsert(target, target.page, target.url, done=True)
+
+    def reset(self, site):
+        self.conn.execute("DELETE FROM checkpoints WHERE site = ?", (site,))
+        self.conn.commit()
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
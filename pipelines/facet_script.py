@@ -0,0 +1,10 @@
+from facets import FacetSummary
+
+def main():
+    facets = FacetSummary()
+    facets.open(build_if_empty=False)
+    facets.rebuild()
+    facets.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import logging
+from datetime import datetime
+from collections import Counter
+from pymongo import MongoClient, UpdateOne, errors
+
+# Listing fields a facet row is keyed on; `MongoPipeline` reads them for the "before" side of updates
+FACET_FIELDS = ("city_norm", "category_norm", "website", "date_scraped")
+
+# Collection holding MongoPipeline's listings generation; also marks a first build in progress
+META_COLLECTION = "meta"
+
+
+def scrape_day(value):
+    return value.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None) if isinstance(value, datetime) else None
+
+
+def facet_key(doc):
+    """(city_norm, category_norm, website, day) a listing is counted under, or None without a scrape date."""
+    day = scrape_day(doc.get("date_scraped"))
+    if day is None:
+        return None
+    return doc.get("city_norm") or "", doc.get("category_norm") or "", doc.get("website") or "", day
+
+
+def facet_id(key) -> str:
+    city, category, website, day = key
+    return f"{city}|{category}|{website}|{day:%Y-%m-%d}"
+
+
+class FacetSummary:
+    """
+    Materialized listing counts per city, category, website and scrape day (`listing_facets`).
+
+    ▸ `record(changes)` – applies `$inc` deltas for written listings; `changes` holds
+      (before, after) pairs, `before` being None for new listings (called by `MongoPipeline`).
+    ▸ `rebuild()` – recounts everything from the listings (see facet_script.py), e.g. after
+      `remove_duplicates` or a bulk import that bypassed the pipeline.
+    ▸ `open()` runs that rebuild once when the summary is empty but listings already exist, so
+      deltas for listings stored before the summary start from real counts.
+
+    The web app sums matching rows of this small collection instead of counting listings.
+    """
+
+    def __init__(self, uri="mongodb://localhost:27017/", db_name="PropertyBot",
+                 listings_collection="listings", collection_name="listing_facets"):
+        self.uri = uri
+        self.db_name = db_name
+        self.listings_collection = listings_collection
+        self.collection_name = collection_name
+        self.client = None
+        self.listings = None
+        self.collection = None
+        self.meta = None
+
+    def open(self, build_if_empty=True):
+        try:
+            self.client = MongoClient(self.uri, serverSelectionTimeoutMS=5000)
+            self.client.server_info()
+            db = self.client[self.db_name]
+            self.listings = db[self.listings_collection]
+            self.collection = db[self.collection_name]
+            self.meta = db[META_COLLECTION]
+            self.collection.create_index([("city_norm", 1), ("category_norm", 1), ("day", 1)])
+            self.collection.create_index([("category_norm", 1), ("day", 1)])
+            self.collection.create_index("day")
+            logging.info(f"✅ Facet summary '{self.collection_name}' ready.")
+        except errors.ServerSelectionTimeoutError as e:
+            logging.error(f"❌ MongoDB connection failed: {e}")
+            raise SystemExit("❌ Cannot connect to MongoDB, exiting.")
+        if build_if_empty:
+            self.build_if_empty()
+
+    def build_if_empty(self) -> bool:
+        """Rebuild an empty summary over existing listings, unless another process is already on it."""
+        if self.collection.find_one({}, {"_id": 1}) or not self.listings.find_one({}, {"_id": 1}):
+            return False
+        claim = {"_id": f"building:{self.collection_name}"}
+        try:
+            self.meta.insert_one({**claim, "started_at": datetime.utcnow()})
+        except errors.DuplicateKeyError:
+            return False
+        try:
+            logging.info(f"🧮 Facet summary '{self.collection_name}' is empty, building it from the listings...")
+            self.rebuild()
+        finally:
+            self.meta.delete_one(claim)
+        return True
+
+    def record(self, changes):
+        deltas = Counter()
+        labels = {}
+        for before, after in changes:
+            old_key = facet_key(before) if before else None
+            new_key = facet_key(after)
+            if old_key == new_key:
+                continue
+            if old_key:
+                deltas[old_key] -= 1
+            if new_key:
+                deltas[new_key] += 1
+                labels[new_key] = {"city": after.get("city"), "category": after.get("category")}
+
+        operations = [self._increment(key, delta, labels.get(key)) for key, delta in deltas.items() if delta]
+        if not operations:
+            return
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logging.error(f"❌ Facet summary update failed, run facet_script.py to rebuild: {e}")
+
+    @staticmethod
+    def _increment(key, delta, labels=None):
+        city, category, website, day = key
+        update = {
+            "$inc": {"count": delta},
+            "$setOnInsert": {"city_norm": city, "category_norm": category, "website": website, "day": day},
+        }
+        if labels:
+            update["$set"] = labels  # latest spelling wins as the display label
+        return UpdateOne({"_id": facet_id(key)}, update, upsert=True)
+
+    def rebuild(self):
+        rows = Counter()
+        labels = {}
+        projection = {field: 1 for field in (*FACET_FIELDS, "city", "category")}
+        for doc in self.listings.find({}, projection).batch_size(2000):
+            key = facet_key(doc)
+            if key:
+                rows[key] += 1
+                labels[key] = {"city": doc.get("city"), "category": doc.get("category")}
+
+        self.collection.delete_many({})
+        operations = [self._increment(key, count, labels[key]) for key, count in rows.items()]
+        for start in range(0, len(operations), 1000):
+            self.collection.bulk_write(operations[start:start + 1000], ordered=False)
+        logging.info(f"🧮 Rebuilt {len(operations)} facet rows.")
+
+    def close(self):
+        if self.client:
+            self.client.close()
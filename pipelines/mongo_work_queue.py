@@ -0,0 +1,138 @@
+import os
+import socket
+import logging
+from datetime import datetime, timedelta
+from pymongo import MongoClient, ReturnDocument, UpdateOne, errors
+
+
+class MongoWorkQueue:
+    """
+    Crawl targets shared between machines through a Mongo collection.
+
+    A producer `enqueue`s targets; workers `lease` one at a time, which hides it from
+    other workers for `visibility_timeout` seconds. `ack` removes it from play, `nack`
+    returns it to the queue (or marks it failed after `max_attempts`). A lease that
+    expires without an ack - the worker died - becomes available again.
+    """
+
+    def __init__(self, uri="mongodb://localhost:27017/", db_name="PropertyBot", collection_name="crawl_queue",
+                 visibility_timeout=600, max_attempts=3, worker_id=None):
+        self.uri = uri
+        self.db_name = db_name
+        self.collection_name = collection_name
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.client = None
+        self.collection = None
+
+    def open(self):
+        try:
+            self.client = MongoClient(self.uri, serverSelectionTimeoutMS=5000)
+            self.client.server_info()
+            self.collection = self.client[self.db_name][self.collection_name]
+            self.collection.create_index([("site", 1), ("status", 1), ("lease_until", 1), ("created_at", 1)])
+            logging.info(f"✅ Work queue '{self.collection_name}' ready.")
+        except errors.ServerSelectionTimeoutError as e:
+            logging.error(f"❌ MongoDB connection failed: {e}")
+            raise SystemExit("❌ Cannot connect to MongoDB, exiting.")
+
+    @staticmethod
+    def task_id(target) -> str:
+        return f"{target.site}|{target.key}|{target.page}"
+
+    def enqueue(self, targets) -> int:
+        """Add targets that are not already queued; returns how many were new."""
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"_id": self.task_id(t)},
+                {"$setOnInsert": {
+                    "site": t.site,
+                    "target": {"url": t.url, "city": t.city, "category": t.category,
+                               "state": t.state, "page": t.page},
+                    "status": "pending",
+                    "attempts": 0,
+                    "lease_until": None,
+                    "created_at": now,
+                }},
+                upsert=True,
+            )
+            for t in targets
+        ]
+        if not operations:
+            return 0
+        result = self.collection.bulk_write(operations, ordered=False)
+        return result.upserted_count
+
+    def fail_expired(self, site=None) -> int:
+        """Mark tasks whose worker died on their last attempt as failed, so they are not stuck as leased."""
+        query = {"status": "leased", "lease_until": {"$lt": datetime.utcnow()},
+                 "attempts": {"$gte": self.max_attempts}}
+        if site:
+            query["site"] = site
+        result = self.collection.update_many(
+            query, {"$set": {"status": "failed", "lease_until": None,
+                             "last_error": "lease expired on the final attempt"}})
+        return result.modified_count
+
+    def lease(self, site):
+        """Claim the oldest available task for `site`; returns (task_id, target fields) or None."""
+        self.fail_expired(site)
+        now = datetime.utcnow()
+        doc = self.collection.find_one_and_update(
+            {
+                "site": site,
+                "attempts": {"$lt": self.max_attempts},
+                "$or": [{"status": "pending"}, {"status": "leased", "lease_until": {"$lt": now}}],
+            },
+            {
+                "$set": {"status": "leased", "worker": self.worker_id,
+                         "lease_until": now + timedelta(seconds=self.visibility_timeout)},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is None:
+            return None
+        return doc["_id"], {"site": doc["site"], **doc["target"]}
+
+    def ack(self, task_id):
+        self.collection.update_one({"_id": task_id, "worker": self.worker_id},
+                                   {"$set": {"status": "done", "lease_until": None,
+                                             "finished_at": datetime.utcnow()}})
+
+    def nack(self, task_id, error=""):
+        doc = self.collection.find_one({"_id": task_id}, {"attempts": 1})
+        exhausted = doc is not None and doc.get("attempts", 0) >= self.max_attempts
+        self.collection.update_one({"_id": task_id, "worker": self.worker_id},
+                                   {"$set": {"status": "failed" if exhausted else "pending",
+                                             "lease_until": None, "last_error": str(error)[:500]}})
+
+    def has_outstanding(self, site) -> bool:
+        """True while tasks are pending or leased - a leased page may still enqueue its next page."""
+        self.fail_expired(site)
+        now = datetime.utcnow()
+        return self.collection.count_documents(
+            {"site": site, "$or": [
+                {"status": "pending"},
+                {"status": "leased", "lease_until": {"$gte": now}},
+                {"status": "leased", "attempts": {"$lt": self.max_attempts}},  # expired, will be re-leased
+            ]},
+            limit=1,
+        ) > 0
+
+    def counts(self, site=None) -> dict:
+        self.fail_expired(site)
+        match = {"site": site} if site else {}
+        pipeline = [{"$match": match}, {"$group": {"_id": "$status", "n": {"$sum": 1}}}]
+        return {doc["_id"]: doc["n"] for doc in self.collection.aggregate(pipeline)}
+
+    def purge(self, site, statuses=("done",)):
+        self.fail_expired(site)
+        self.collection.delete_many({"site": site, "status": {"$in": list(statuses)}})
+
+    def close(self):
+        if self.client:
+            self.client.close()
@@ -1,7 +1,10 @@
 import os
+import json
 import time
+import hashlib
 import logging
-from pymongo import MongoClient, errors
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, MongoClient, UpdateOne, errors
 
 # Setup logging to both console and file
 logging.basicConfig(
@@ -13,8 +16,45 @@ logging.basicConfig(
     ]
 )
 
+DUPLICATE_KEY_ERROR = 11000
+
+# Fields that change on every scrape and must not affect the content hash
+VOLATILE_FIELDS = {"_id", "date_scraped", "content_hash", "first_seen", "last_seen", "price_history"}
+
+
+# Counter the web app reads to invalidate its cached query results; bumped after every write
+# that changes what a listings query can return
+META_COLLECTION = "meta"
+LISTINGS_GENERATION_ID = "listings_generation"
+
+
+# Indexes behind the web app's filters: exact match on the normalized fields, then the
+# (price_int, _id) order the home page pages through with keyset cursors. The date_scraped
+# ones serve the "scraped after" ranges, where a short window beats walking the price order
+LISTING_INDEXES = [
+    [("city_norm", ASCENDING), ("category_norm", ASCENDING), ("price_int", ASCENDING), ("_id", ASCENDING)],
+    [("city_norm", ASCENDING), ("price_int", ASCENDING), ("_id", ASCENDING)],
+    [("category_norm", ASCENDING), ("price_int", ASCENDING), ("_id", ASCENDING)],
+    [("price_int", ASCENDING), ("_id", ASCENDING)],
+    [("city_norm", ASCENDING), ("category_norm", ASCENDING), ("date_scraped", ASCENDING)],
+    [("date_scraped", ASCENDING)],
+]
+
+
+def normalize_facet(value) -> str:
+    """Lowercased, trimmed form of a city/category, stored as `*_norm` for exact-match filtering."""
+    return str(value or "").strip().lower()
+
+
+def listing_hash(item: dict) -> str:
+    """Stable hash of a listing's scraped content, used to detect real changes."""
+    content = {k: v for k, v in item.items() if k not in VOLATILE_FIELDS}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
 class MongoPipeline:
-    def __init__(self, uri="mongodb://localhost:27017/", db_name="PropertyBot", collection_name="listings"):
+    def __init__(self, uri="mongodb://localhost:27017/", db_name="PropertyBot", collection_name="listings",
+                 buffered=False, batch_size=500, flush_interval=10.0, incremental=False, rollups=None, facets=None):
         self.uri = uri
         self.db_name = db_name
         self.collection_name = collection_name
@@ -22,6 +62,25 @@ class MongoPipeline:
         self.db = None
         self.collection = None
 
+        # Buffered mode: collect items and flush them in one unordered bulk write
+        self.buffered = buffered
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.last_flush = time.monotonic()
+
+        # Incremental mode: upsert on `url` and only rewrite listings whose content hash changed
+        self.incremental = incremental
+        self.stats = {"inserted": 0, "updated": 0, "unchanged": 0, "duplicates": 0, "failed": 0}
+
+        # Single inserts mark the pipeline dirty; the generation is bumped once on close
+        self.dirty = False
+
+        # Optional PriceRollups (refreshed on close) and FacetSummary (updated every flush),
+        # both fed the listings each write inserted or changed
+        self.rollups = rollups
+        self.facets = facets
+
     def open(self):
         try:
             self.client = MongoClient(self.uri, serverSelectionTimeoutMS=5000)
@@ -29,19 +88,50 @@ class MongoPipeline:
             self.db = self.client[self.db_name]
             self.collection = self.db[self.collection_name]
             self.collection.create_index("url", unique=True)
-            logging.info("✅ MongoDB connected and index ensured.")
+            self.ensure_indexes()
+            logging.info("✅ MongoDB connected and indexes ensured.")
         except errors.ServerSelectionTimeoutError as e:
             logging.error(f"❌ MongoDB connection failed: {e}")
             raise SystemExit("❌ Cannot connect to MongoDB, exiting.")
 
+    def ensure_indexes(self):
+        for keys in LISTING_INDEXES:
+            self.collection.create_index(keys)
+
+    def bump_generation(self):
+        """Tell readers (the web app's result cache) that the listings changed."""
+        try:
+            self.db[META_COLLECTION].update_one(
+                {"_id": LISTINGS_GENERATION_ID},
+                {"$inc": {"value": 1}, "$currentDate": {"updated_at": True}},
+                upsert=True,
+            )
+            self.dirty = False
+        except Exception as e:
+            logging.error(f"❌ Could not bump listings generation: {e}")
+
     def process_item(self, item, max_retries=3):
+        item["city_norm"] = normalize_facet(item.get("city"))
+        item["category_norm"] = normalize_facet(item.get("category"))
+
+        if self.buffered or self.incremental:
+            self.buffer.append(item)
+            if (not self.buffered or len(self.buffer) >= self.batch_size
+                    or time.monotonic() - self.last_flush >= self.flush_interval):
+                self.flush(max_retries)
+            return
+
         retries = 0
         while retries < max_retries:
             try:
                 self.collection.insert_one(item)
+                self.stats["inserted"] += 1
+                self.dirty = True
+                self._notify([(None, item)])
                 logging.info(f"✅ Inserted: {item.get('url')}")
                 return
             except errors.DuplicateKeyError:
+                self.stats["duplicates"] += 1
                 logging.warning(f"⚠️ Duplicate skipped: {item.get('url', '[no url]')}")
                 return
             except Exception as e:
@@ -49,8 +139,161 @@ class MongoPipeline:
                 logging.error(f"❌ Insert failed (attempt {retries}): {e}")
                 time.sleep(2)
 
+        self.stats["failed"] += 1
         logging.error(f"❌ Final failure inserting item after {max_retries} retries: {item.get('url', '[no url]')}")
 
+    def flush(self, max_retries=3):
+        """Write the buffered items as one unordered bulk upsert keyed on `url`."""
+        batch, self.buffer = self.buffer, []
+        self.last_flush = time.monotonic()
+        if not batch:
+            return
+
+        retries = 0
+        while retries < max_retries:
+            try:
+                if self.incremental:
+                    operations, counts, changes = self._incremental_operations(batch)
+                else:
+                    # `$setOnInsert` keeps the insert-only behaviour: existing URLs are left untouched
+                    operations = [UpdateOne({"url": item.get("url")}, {"$setOnInsert": item}, upsert=True)
+                                  for item in batch]
+                    counts = {}
+                result = self.collection.bulk_write(operations, ordered=False) if operations else None
+                inserted, failed = (result.upserted_count if result else 0), 0
+                if not self.incremental:
+                    changes = [(None, batch[index]) for index in (result.upserted_ids if result else {})]
+                break
+            except errors.BulkWriteError as e:
+                # Unordered: everything except the reported write errors was applied
+                details = e.details
+                write_errors = details.get("writeErrors", [])
+                dup_errors = sum(1 for err in write_errors if err.get("code") == DUPLICATE_KEY_ERROR)
+                failed = len(write_errors) - dup_errors
+                inserted = details.get("nUpserted", 0)
+                if not self.incremental:
+                    changes = [(None, batch[upsert["index"]]) for upsert in details.get("upserted", [])]
+                if failed:
+                    logging.error(f"❌ {failed} items failed in bulk write: {write_errors[0].get('errmsg')}")
+                break
+            except Exception as e:
+                retries += 1
+                logging.error(f"❌ Bulk write failed (attempt {retries}): {e}")
+                time.sleep(2)
+        else:
+            self.stats["failed"] += len(batch)
+            logging.error(f"❌ Final failure writing batch of {len(batch)} items after {max_retries} retries.")
+            return
+
+        if not self.incremental:
+            counts = {"duplicates": len(batch) - inserted - failed}
+        counts.update(inserted=inserted, failed=failed)
+        for key, value in counts.items():
+            self.stats[key] += value
+        # Facet rows first: a reader that sees the new generation must also see the new counts
+        self._notify(changes)
+        if inserted or counts.get("updated"):
+            self.bump_generation()
+        logging.info(f"✅ Flushed {len(batch)} items: " + ", ".join(f"{v} {k}" for k, v in counts.items()))
+
+    def _notify(self, changes):
+        """Pass (before, after) pairs of written listings on; `before` is None for new ones."""
+        if not changes:
+            return
+        if self.rollups:
+            # Old groups too: a listing that moved city/bedrooms/website must leave its old rollup
+            self.rollups.track([doc for pair in changes for doc in pair if doc])
+        if self.facets:
+            self.facets.record(changes)
+
+    def _incremental_operations(self, batch):
+        """Build upserts for changed listings and `last_seen` touches for unchanged ones; also returns (before, after) pairs."""
+        now = datetime.utcnow()
+        latest = {item.get("url"): item for item in batch}  # last scrape of a URL in the batch wins
+        known = {
+            doc["url"]: doc
+            for doc in self.collection.find({"url": {"$in": list(latest)}},
+                                            {"url": 1, "content_hash": 1, "price": 1, "price_int": 1,
+                                             "city_norm": 1, "category_norm": 1, "bedrooms": 1, "website": 1,
+                                             "date_scraped": 1, "first_seen": 1, "price_history": {"$slice": 1}})
+        }
+
+        operations = []
+        changes = []
+        counts = {"updated": 0, "unchanged": 0, "duplicates": len(batch) - len(latest)}
+        for url, item in latest.items():
+            doc = {k: v for k, v in item.items() if k != "_id"}
+            content_hash = listing_hash(doc)
+            existing = known.get(url)
+
+            if existing and existing.get("content_hash") == content_hash:
+                operations.append(UpdateOne({"url": url}, {"$set": {"last_seen": now}}))
+                counts["unchanged"] += 1
+                continue
+
+            update = {"$set": {**doc, "content_hash": content_hash, "last_seen": now}}
+            history = []
+            if not existing:
+                update["$setOnInsert"] = {"first_seen": now}
+            else:
+                # Listings stored before change tracking: date them from their last scrape and
+                # start the history at the stored price, so the first change keeps the old one
+                seen = existing.get("first_seen") or existing.get("date_scraped") or now
+                if "first_seen" not in existing:
+                    update["$set"]["first_seen"] = seen
+                if "price_history" not in existing:
+                    history.append({"price": existing.get("price"), "price_int": existing.get("price_int"),
+                                    "date": existing.get("date_scraped") or seen})
+            if not existing or existing.get("price_int") != doc.get("price_int"):
+                history.append({"price": doc.get("price"), "price_int": doc.get("price_int"), "date": now})
+            if history:
+                update["$push"] = {"price_history": {"$each": history}}
+            if existing:
+                counts["updated"] += 1
+            operations.append(UpdateOne({"url": url}, update, upsert=True))
+            changes.append((existing, doc))
+
+        return operations, counts, changes
+
+    def filter_new_urls(self, urls, stale_after: timedelta = None):
+        """
+        Return the URLs worth visiting: unknown ones, plus known ones not seen within `stale_after`.
+        One `$in` query per call; URLs still waiting in the write buffer count as fresh.
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return []
+
+        pending = {item.get("url") for item in self.buffer}
+        cutoff = datetime.utcnow() - stale_after if stale_after else None
+        fresh = set()
+        try:
+            for doc in self.collection.find({"url": {"$in": urls}}, {"url": 1, "last_seen": 1, "date_scraped": 1}):
+                seen = doc.get("last_seen") or doc.get("date_scraped")
+                if cutoff is None or (seen and seen >= cutoff):
+                    fresh.add(doc["url"])
+        except Exception as e:
+            logging.error(f"❌ Known-URL lookup failed, visiting all links: {e}")
+
+        return [url for url in urls if url not in fresh and url not in pending]
+
+    def backfill_normalized_fields(self):
+        """Add `city_norm`/`category_norm` to documents stored before they were written at ingest."""
+        logging.info("🧮 Backfilling normalized city/category fields...")
+        try:
+            result = self.collection.update_many(
+                {"$or": [{"city_norm": {"$exists": False}}, {"category_norm": {"$exists": False}}]},
+                [{"$set": {
+                    "city_norm": {"$toLower": {"$trim": {"input": {"$toString": {"$ifNull": ["$city", ""]}}}}},
+                    "category_norm": {"$toLower": {"$trim": {"input": {"$toString": {"$ifNull": ["$category", ""]}}}}},
+                }}],
+            )
+            logging.info(f"✅ Backfilled {result.modified_count} records.")
+            if result.modified_count:
+                self.bump_generation()
+        except Exception as e:
+            logging.error(f"❌ Error during backfill: {e}")
+
     def remove_duplicates(self):
         logging.info("🧹 Running duplicate cleanup...")
         pipeline = [
@@ -74,10 +317,18 @@ class MongoPipeline:
                 removed += result.deleted_count
 
             logging.info(f"✅ Removed {removed} duplicate records.")
+            if removed:
+                self.bump_generation()
         except Exception as e:
             logging.error(f"❌ Error during duplicate cleanup: {e}")
 
     def close(self):
+        if self.buffer and self.collection is not None:
+            self.flush()
+        if self.rollups and self.rollups.refresh():
+            self.dirty = True  # rollups changed after the last bump
+        if self.dirty and self.db is not None:
+            self.bump_generation()
         if self.client:
             self.client.close()
             logging.info("🔒 MongoDB connection closed.")
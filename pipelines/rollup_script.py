@@ -0,0 +1,10 @@
+from rollups import PriceRollups
+
+def main():
+    rollups = PriceRollups()
+    rollups.open(build_if_empty=False)
+    rollups.rebuild()
+    rollups.close()
+
+if __name__ == "__main__":
+    main()
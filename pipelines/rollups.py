@@ -0,0 +1,192 @@
+import logging
+from datetime import datetime
+from pymongo import MongoClient, errors
+
+# Rollup dimension -> listing field it groups on
+ROLLUP_DIMENSIONS = {
+    "city": "city_norm",
+    "category": "category_norm",
+    "bedrooms": "bedrooms",
+    "website": "website",
+    "month": "date_scraped",  # bucketed as "YYYY-MM"
+}
+
+# Percentile -> field name in the rollup document
+PERCENTILES = {0.1: "p10", 0.25: "p25", 0.5: "median", 0.75: "p75", 0.9: "p90"}
+
+# Collection holding MongoPipeline's listings generation; also marks a first build in progress
+META_COLLECTION = "meta"
+
+
+def month_bucket(value):
+    return value.strftime("%Y-%m") if isinstance(value, datetime) else None
+
+
+def group_keys(item) -> set:
+    """The (dimension, value) rollup groups a listing belongs to."""
+    keys = set()
+    for dimension, field in ROLLUP_DIMENSIONS.items():
+        value = month_bucket(item.get(field)) if dimension == "month" else item.get(field)
+        if value is not None:
+            keys.add((dimension, str(value)))
+    return keys
+
+
+def group_match(dimension, value) -> dict:
+    """Listings query selecting one rollup group."""
+    if dimension == "month":
+        start = datetime.strptime(value, "%Y-%m")
+        end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+        return {"date_scraped": {"$gte": start, "$lt": end}}
+    return {ROLLUP_DIMENSIONS[dimension]: value}
+
+
+class PriceRollups:
+    """
+    Precomputed `price_int` statistics per city, category, bedrooms, website and month.
+
+    ▸ `track(items)` – remember the groups touched by written listings (called by `MongoPipeline`).
+    ▸ `refresh()` – recompute only those groups; one rollup document per group holds
+      count, priced (price_int > 0), min/mean/max and the PERCENTILES.
+    ▸ `rebuild()` – recompute every group from scratch (see rollup_script.py); `open()` runs
+      it once when there are listings but no rollups yet, so untouched groups are not missing.
+
+    Percentiles use `$percentile` on MongoDB 7.0+ and fall back to walking the group's
+    prices in sorted order on older servers.
+    """
+
+    def __init__(self, uri="mongodb://localhost:27017/", db_name="PropertyBot",
+                 listings_collection="listings", collection_name="price_rollups"):
+        self.uri = uri
+        self.db_name = db_name
+        self.listings_collection = listings_collection
+        self.collection_name = collection_name
+        self.client = None
+        self.listings = None
+        self.collection = None
+        self.meta = None
+        self.dirty = set()
+        self.native_percentiles = True
+
+    def open(self, build_if_empty=True):
+        try:
+            self.client = MongoClient(self.uri, serverSelectionTimeoutMS=5000)
+            self.client.server_info()
+            db = self.client[self.db_name]
+            self.listings = db[self.listings_collection]
+            self.collection = db[self.collection_name]
+            self.meta = db[META_COLLECTION]
+            self.collection.create_index([("dimension", 1), ("count", -1)])
+            logging.info(f"✅ Price rollups '{self.collection_name}' ready.")
+        except errors.ServerSelectionTimeoutError as e:
+            logging.error(f"❌ MongoDB connection failed: {e}")
+            raise SystemExit("❌ Cannot connect to MongoDB, exiting.")
+        if build_if_empty:
+            self.build_if_empty()
+
+    def build_if_empty(self) -> bool:
+        """Rebuild when there are listings but no rollups, unless another process is already on it."""
+        if self.collection.find_one({}, {"_id": 1}) or not self.listings.find_one({}, {"_id": 1}):
+            return False
+        claim = {"_id": f"building:{self.collection_name}"}
+        try:
+            self.meta.insert_one({**claim, "started_at": datetime.utcnow()})
+        except errors.DuplicateKeyError:
+            return False
+        try:
+            logging.info(f"📊 Price rollups '{self.collection_name}' are empty, building them from the listings...")
+            self.rebuild()
+        finally:
+            self.meta.delete_one(claim)
+        return True
+
+    def track(self, items):
+        for item in items:
+            self.dirty.update(group_keys(item))
+
+    def refresh(self) -> int:
+        """Recompute the tracked groups; returns how many were refreshed."""
+        groups, self.dirty = self.dirty, set()
+        if any(dimension == "month" for dimension, _ in groups):
+            # Re-scraped listings move to the current month, so older buckets shrink too
+            groups.update(("month", doc["value"]) for doc in self.collection.find({"dimension": "month"}, {"value": 1}))
+        for dimension, value in groups:
+            self.refresh_group(dimension, value)
+        if groups:
+            logging.info(f"📊 Refreshed {len(groups)} price rollups.")
+        return len(groups)
+
+    def rebuild(self):
+        groups = set()
+        for dimension, field in ROLLUP_DIMENSIONS.items():
+            if dimension == "month":
+                buckets = self.listings.aggregate([
+                    {"$match": {"date_scraped": {"$type": "date"}}},
+                    {"$group": {"_id": {"$dateToString": {"format": "%Y-%m", "date": "$date_scraped"}}}},
+                ])
+                groups.update(("month", doc["_id"]) for doc in buckets)
+            else:
+                groups.update((dimension, str(value)) for value in self.listings.distinct(field) if value is not None)
+
+        self.collection.delete_many({"_id": {"$nin": [f"{d}|{v}" for d, v in groups]}})
+        for dimension, value in groups:
+            self.refresh_group(dimension, value)
+        logging.info(f"📊 Rebuilt {len(groups)} price rollups.")
+
+    def refresh_group(self, dimension, value):
+        rollup_id = f"{dimension}|{value}"
+        match = group_match(dimension, value)
+        count = self.listings.count_documents(match)
+        if not count:
+            self.collection.delete_one({"_id": rollup_id})
+            return
+
+        priced_match = {"$and": [match, {"price_int": {"$gt": 0}}]}
+        stats = self._price_stats(priced_match)
+        self.collection.replace_one(
+            {"_id": rollup_id},
+            {"dimension": dimension, "value": value, "count": count, **stats, "updated_at": datetime.utcnow()},
+            upsert=True,
+        )
+
+    def _price_stats(self, priced_match) -> dict:
+        group = {"_id": None, "priced": {"$sum": 1}, "min": {"$min": "$price_int"},
+                 "mean": {"$avg": "$price_int"}, "max": {"$max": "$price_int"}}
+        if self.native_percentiles:
+            group["percentiles"] = {"$percentile": {"input": "$price_int", "p": list(PERCENTILES),
+                                                    "method": "approximate"}}
+        try:
+            result = next(self.listings.aggregate([{"$match": priced_match}, {"$group": group}]), None)
+        except errors.OperationFailure:
+            if not self.native_percentiles:
+                raise
+            self.native_percentiles = False  # server older than 7.0
+            return self._price_stats(priced_match)
+
+        if result is None:
+            return {"priced": 0, "min": None, "mean": None, "max": None, **{name: None for name in PERCENTILES.values()}}
+
+        values = result.get("percentiles") or self._percentiles_by_scan(priced_match, result["priced"])
+        return {
+            "priced": result["priced"],
+            "min": result["min"],
+            "mean": round(result["mean"], 2),
+            "max": result["max"],
+            **dict(zip(PERCENTILES.values(), values)),
+        }
+
+    def _percentiles_by_scan(self, priced_match, n) -> list:
+        """Nearest-rank percentiles from one sorted pass over the group's prices."""
+        ranks = [min(n - 1, round(p * (n - 1))) for p in PERCENTILES]
+        wanted, found = set(ranks), {}
+        cursor = self.listings.find(priced_match, {"price_int": 1, "_id": 0}).sort("price_int", 1)
+        for rank, doc in enumerate(cursor):
+            if rank in wanted:
+                found[rank] = doc["price_int"]
+                if len(found) == len(wanted):
+                    break
+        return [found.get(rank) for rank in ranks]
+
+    def close(self):
+        if self.client:
+            self.client.close()
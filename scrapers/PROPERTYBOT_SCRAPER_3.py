@@ -1,15 +1,11 @@
-import time
-import re
 import logging
-from pprint import pformat
 from datetime import datetime
-from playwright.sync_api import sync_playwright
-from pipelines.mongodb_pipeline import MongoPipeline
-from middlewares.user_agent_middleware import RotatingUserAgentMiddleware
-from utils.sheet_writer import write_properties
+from urllib.parse import urljoin
+from middlewares.resource_blocking_middleware import ResourceBlockingMiddleware
+from scrapers.crawl_engine import CrawlEngine, PageResult, SiteDefinition, Target
+from scrapers.runner import run_site
 import sys
 import os
-import random
 
 # -- Logging setup (UTF-8 compatible) --
 if os.name == "nt":
@@ -33,125 +29,120 @@ console_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(me
 logger.addHandler(console_handler)
 
 # -- Helpers --
-def safe_inner_text(element, default="N/A"):
+async def safe_get_attribute(element, attr, default="N/A"):
     try:
-        return element.inner_text().replace("\xa0", " ").strip() if element else default
-    except:
-        return default
-
-def safe_get_attribute(element, attr, default="N/A"):
-    try:
-        return element.get_attribute(attr) if element else default
+        return await element.get_attribute(attr) if element else default
     except:
         return default
 
 def normalize_zero_to_na(value):
     return "N/A" if value == "0" else value
 
+# -- Config --
+WEBSITE = "example.com"
+CRAWLER_ID = "PROPERTYBOT_SCRAPER_3"  # unique per scraper; WEBSITE may be shared
+CONCURRENCY = 4
+
+BLOCKED_URL_KEYWORDS = ["ads", "criteo", "utm_", "tracking"]
+
+CARD_FIELDS = {
+    "title": "h4",
+    "price": "span.price",
+    "location": "address",
+}
+
 # -- Core Scraper --
-def scrape_location(page, city_url, city_name, pipeline, listings, max_pages=3, category="N/A"):
+async def scrape_location(page, target, crawler):
+    city_name, category = target.city, target.category
+
     try:
-        page.goto(city_url, wait_until="domcontentloaded", timeout=60000)
-        page.wait_for_selector("div.property-listing", timeout=15000)
+        cards = await crawler.extract_cards(page, target)
     except Exception as e:
-        logging.error(f"Failed to load {city_url}: {e}")
-        return
+        logging.error(f"Error selecting listings: {e}")
+        return PageResult()
 
-    for page_num in range(max_pages):
-        logging.info(f"📄 Scraping {city_name.title()} - {category.title()} - Page {page_num + 1}...")
+    if not cards:
+        logging.warning("⚠️ No listings found.")
+        return PageResult()
 
+    listings = []
+    for card in cards:
         try:
-            listings_on_page = page.query_selector_all("div.property-listing")
+            full_url = "https://example.com/fake-url"
+            image_url = "https://example.com/image.jpg"
+
+            listing_data = {
+                "website": WEBSITE,
+                "city": city_name,
+                "category": category,
+                "title": card["title"],
+                "price": card["price"],
+                "price_int": 0,
+                "location": card["location"],
+                "bedrooms": "N/A",
+                "bathrooms": "N/A",
+                "toilets": "N/A",
+                "agent_name": "REDACTED",
+                "phone": "REDACTED",
+                "image_url": image_url,
+                "url": full_url,
+                "date_scraped": datetime.utcnow()
+            }
+
+            listings.append(listing_data)
         except Exception as e:
-            logging.error(f"Error selecting listings: {e}")
-            break
-
-        if not listings_on_page:
-            logging.warning("⚠️ No listings found.")
-            break
-
-        for listing in listings_on_page:
-            try:
-                title = safe_inner_text(listing.query_selector("h4"))
-                price = safe_inner_text(listing.query_selector("span.price"))
-                location = safe_inner_text(listing.query_selector("address"))
-                full_url = "https://example.com/fake-url"
-                image_url = "https://example.com/image.jpg"
-
-                listing_data = {
-                    "website": "example.com",
-                    "city": city_name,
-                    "category": category,
-                    "title": title,
-                    "price": price,
-                    "price_int": 0,
-                    "location": location,
-                    "bedrooms": "N/A",
-                    "bathrooms": "N/A",
-                    "toilets": "N/A",
-                    "agent_name": "REDACTED",
-                    "phone": "REDACTED",
-                    "image_url": image_url,
-                    "url": full_url,
-                    "date_scraped": datetime.utcnow()
-                }
-
-                pipeline.process_item(listing_data)
-                listings.append(listing_data)
-                logging.info(pformat(listing_data, sort_dicts=False))
-
-                time.sleep(random.uniform(0.5, 1.2))  # throttle
-            except Exception as e:
-                logging.error(f"❌ Listing error: {e}")
+            logging.error(f"❌ Listing error: {e}")
 
-        try:
-            next_button = page.query_selector("a.next-page")
-            if next_button:
-                next_button.click()
-                page.wait_for_load_state("domcontentloaded", timeout=10000)
-                time.sleep(2)
-            else:
-                break
-        except Exception as e:
-            logging.warning(f"Pagination failed: {e}")
-            break
+    next_url = None
+    try:
+        next_button = await page.query_selector("a.next-page")
+        href = await safe_get_attribute(next_button, "href", None)
+        if href:
+            next_url = urljoin(page.url, href)
+    except Exception as e:
+        logging.warning(f"Pagination failed: {e}")
 
-# -- Main loop over cities/categories --
-def scrape_cities(categories, cities, pipeline, listings, max_pages=3):
-    with sync_playwright() as p:
+    return PageResult(listings, next_url)
+
+# -- Site definition over cities/categories --
+def build_site(categories, cities, max_pages=3):
+    def build_targets():
         for category in categories:
             for city in cities:
-                browser = p.chromium.launch(headless=True)
-                context = browser.new_context()
+                yield Target(site=CRAWLER_ID, url=f"https://example.com/for-sale/{category}/{city}",
+                             city=city, category=category)
+
+    return SiteDefinition(
+        name=CRAWLER_ID,
+        website=WEBSITE,
+        targets=build_targets,
+        parse=scrape_location,
+        ready_selector="div.property-listing",
+        card_selector="div.property-listing",
+        card_fields=CARD_FIELDS,
+        concurrency=CONCURRENCY,
+        fetch_mode="http",  # results pages are server-rendered; falls back to the browser if not
+        max_pages=max_pages,
+        wait_until="domcontentloaded",
+        # Route filtering (assets, ads, trackers, unwanted domains)
+        routes=[ResourceBlockingMiddleware("default", url_keywords=BLOCKED_URL_KEYWORDS)],
+    )
+
+def scrape_cities(categories, cities, pipeline, max_pages=3):
+    site = build_site(categories, cities, max_pages)
+    return CrawlEngine([site], pipeline).run()[site.name]
 
-                # Route filtering (ads, trackers, unwanted domains)
-                def block_routes(route, request):
-                    if any(k in request.url for k in ["ads", "criteo", "utm_", "tracking"]):
-                        return route.abort()
-                    return route.continue_()
+# -- Entry point --
+cities_to_scrape = ["lagos", "abuja"]
+categories_to_scrape = ["houses", "land", "commercial", "flats-apartments"]
 
-                context.route("**/*", block_routes)
-                context.route("**/*", RotatingUserAgentMiddleware())
+SITE = build_site(categories_to_scrape, cities_to_scrape, max_pages=3)
 
-                page = context.new_page()
-                city_url = f"https://example.com/for-sale/{category}/{city}"
-                scrape_location(page, city_url, city, pipeline, listings, max_pages, category)
+def run(**options):
+    return run_site(SITE, **options)
 
-                page.close()
-                context.close()
-                browser.close()
+def main():
+    run()
 
-# -- Entry point --
 if __name__ == "__main__":
-    cities_to_scrape = ["lagos", "abuja"]
-    categories_to_scrape = ["houses", "land", "commercial", "flats-apartments"]
-
-    pipeline = MongoPipeline()
-    pipeline.open()
-
-    listings = []
-    scrape_cities(categories_to_scrape, cities_to_scrape, pipeline, listings, max_pages=3)
-
-    pipeline.close()
-    logging.info("✅ Scraping complete.")
-    write_properties(listings, website="example.com", clear_first=True, prepend=True)
+    main()
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class _PooledBrowser:
+    browser: object
+    served: int = 0
+    active: int = 0
+    retiring: bool = False
+    closed: bool = False
+
+    async def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            await self.browser.close()
+
+
+class BrowserPool:
+    """
+    Launches Chromium once and hands out fresh contexts from it.
+
+    The browser is recycled after `max_contexts` contexts, or as soon as a page's
+    JS heap exceeds `max_heap_mb`. A retired browser keeps serving the contexts
+    already open on it and is closed when the last one is released.
+    """
+
+    def __init__(self, playwright, headless=True, max_contexts=200, max_heap_mb: Optional[float] = None,
+                 launch_options: Optional[dict] = None):
+        self.playwright = playwright
+        self.headless = headless
+        self.max_contexts = max_contexts
+        self.max_heap_mb = max_heap_mb
+        self.launch_options = launch_options or {}
+        self.current: Optional[_PooledBrowser] = None
+        self.launches = 0
+        self._lock = asyncio.Lock()
+
+    async def _launch(self) -> _PooledBrowser:
+        browser = await self.playwright.chromium.launch(headless=self.headless, **self.launch_options)
+        self.launches += 1
+        logging.info(f"🧭 Browser launched (#{self.launches}).")
+        return _PooledBrowser(browser)
+
+    async def _acquire(self) -> _PooledBrowser:
+        async with self._lock:
+            if self.current is None or self.current.retiring:
+                self.current = await self._launch()
+            entry = self.current
+            entry.served += 1
+            entry.active += 1
+            if self.max_contexts and entry.served >= self.max_contexts:
+                self._retire(entry, f"served {entry.served} contexts")
+            return entry
+
+    def _retire(self, entry: _PooledBrowser, reason: str) -> None:
+        if not entry.retiring:
+            entry.retiring = True
+            logging.info(f"♻️ Recycling browser: {reason}.")
+
+    async def _release(self, entry: _PooledBrowser) -> None:
+        entry.active -= 1
+        if entry.retiring and entry.active == 0:
+            await entry.close()
+
+    async def _heap_mb(self, context) -> float:
+        # Chromium-only: read the renderer's JS heap through CDP
+        heaviest = 0.0
+        for page in context.pages:
+            try:
+                cdp = await context.new_cdp_session(page)
+                await cdp.send("Performance.enable")
+                metrics = await cdp.send("Performance.getMetrics")
+                used = next((m["value"] for m in metrics["metrics"] if m["name"] == "JSHeapUsedSize"), 0)
+                heaviest = max(heaviest, used / 1_048_576)
+            except Exception:
+                continue
+        return heaviest
+
+    @asynccontextmanager
+    async def context(self, **options):
+        entry = await self._acquire()
+        try:
+            context = await entry.browser.new_context(**options)
+            try:
+                yield context
+            finally:
+                if self.max_heap_mb:
+                    heap = await self._heap_mb(context)
+                    if heap > self.max_heap_mb:
+                        self._retire(entry, f"JS heap {heap:.0f} MB over {self.max_heap_mb} MB")
+                await context.close()
+        finally:
+            await self._release(entry)
+
+    async def close(self) -> None:
+        if self.current:
+            await self.current.close()
+        self.current = None
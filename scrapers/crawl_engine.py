@@ -0,0 +1,382 @@
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, replace
+from pprint import pformat
+from typing import Awaitable, Callable, Iterable, Optional
+
+from playwright.async_api import async_playwright
+from playwright_stealth import stealth_async
+from middlewares.autothrottle import AutoThrottle, parse_retry_after
+from middlewares.user_agent_middleware import RotatingUserAgentMiddleware
+from scrapers.browser_pool import BrowserPool
+from scrapers.http_fetcher import HttpFetcher
+from scrapers import extraction
+from scrapers.extraction import HtmlPage
+
+# ---------------------------- Work Units ----------------------------
+
+@dataclass(frozen=True)
+class Target:
+    """A single results page to crawl for one site/city/category."""
+    site: str
+    url: str
+    city: str
+    category: str = "N/A"
+    state: Optional[str] = None
+    page: int = 1
+
+    @property
+    def key(self) -> str:
+        """Identity of the city/category being paginated, shared by all of its pages."""
+        return f"{self.state or ''}|{self.city}|{self.category}"
+
+    def next_page(self, url: str) -> "Target":
+        return self.at_page(self.page + 1, url)
+
+    def at_page(self, page: int, url: str) -> "Target":
+        return replace(self, url=url, page=page)
+
+
+@dataclass
+class PageResult:
+    """What a site's parse function hands back to the engine."""
+    items: list = field(default_factory=list)
+    next_url: Optional[str] = None
+
+
+@dataclass
+class SiteDefinition:
+    """
+    ▸ `name` – unique crawler id (the scraper module name). It keys per-site results and limits,
+      `Target.site`, checkpoints and work-queue tasks, so two crawlers must never share it.
+    ▸ `website` – the site label written on listings and Sheets rows (defaults to `name`).
+      Several crawlers may use the same one.
+    ▸ `targets` – callable yielding the initial `Target`s (page 1 of each city/category).
+    ▸ `parse` – `async (page, target, crawler) -> PageResult` run once the page is ready.
+    ▸ `ready_selector` – selector to wait for after navigation, instead of a fixed sleep.
+    ▸ `concurrency` – number of pages this site may have open at the same time.
+    ▸ `max_pages` – pagination depth per city/category.
+    ▸ `detail_concurrency` – extra tabs per results page used by `CrawlEngine.fetch_details`.
+    ▸ `card_selector` / `card_fields` – listing cards and their field→selector map
+      (see `scrapers.extraction`), read in one call by `CrawlEngine.extract_cards`.
+    ▸ `fetch_mode` / `detail_fetch_mode` – "browser" to render results/detail pages in
+      Chromium, "http" to fetch raw HTML and parse it with lxml. An "http" results page
+      without `ready_selector` in its HTML is retried in the browser.
+    """
+    name: str
+    targets: Callable[[], Iterable[Target]]
+    parse: Callable[..., Awaitable[PageResult]]
+    ready_selector: Optional[str] = None
+    concurrency: int = 2
+    max_pages: int = 1
+    detail_concurrency: int = 3
+    card_selector: Optional[str] = None
+    card_fields: dict = field(default_factory=dict)
+    fetch_mode: str = "browser"
+    detail_fetch_mode: str = "browser"
+    wait_until: str = "load"
+    stealth: bool = False
+    context_options: dict = field(default_factory=dict)
+    routes: list = field(default_factory=list)
+    website: Optional[str] = None
+
+    def __post_init__(self):
+        if self.website is None:
+            self.website = self.name
+
+# ---------------------------- Engine ----------------------------
+
+QUEUE_POLL_SECONDS = 5
+
+class CrawlEngine:
+    """
+    Runs one or more sites on a shared, recycled async Playwright browser (`BrowserPool`).
+
+    Every site gets its own work queue of `Target`s and a pool of workers sized by
+    its concurrency limit; pagination pushes the next page back onto the same queue,
+    so all cities/categories/pages of a site are crawled side by side. With a
+    `work_queue` (`MongoWorkQueue`) the targets come from, and next pages go to,
+    a queue shared with workers on other machines instead.
+    """
+
+    def __init__(self, sites, pipeline, concurrency: Optional[dict] = None, headless: bool = True,
+                 recycle_after: int = 200, max_heap_mb: Optional[float] = None,
+                 throttle: Optional[AutoThrottle] = None, checkpoints=None, work_queue=None):
+        self.sites = {site.name: site for site in sites}
+        if len(self.sites) != len(sites):
+            # Checkpoints, queue tasks and results are keyed on the name: a clash would mix two crawls
+            raise ValueError(f"Duplicate site names: {[site.name for site in sites]}")
+        self.pipeline = pipeline
+        self.concurrency = concurrency or {}
+        self.headless = headless
+        self.recycle_after = recycle_after
+        self.max_heap_mb = max_heap_mb
+        self.throttle = throttle or AutoThrottle()
+        self.checkpoints = checkpoints
+        self.work_queue = work_queue
+        self.user_agent_middleware = RotatingUserAgentMiddleware()
+        self.pool = None
+        self.http = None
+        self.io_executor = None
+        self.results = {name: [] for name in self.sites}
+        self.errors = {name: 0 for name in self.sites}
+        self.bytes_fetched = 0
+
+    def run(self) -> dict:
+        return asyncio.run(self.crawl())
+
+    async def crawl(self) -> dict:
+        # One thread for blocking Mongo/SQLite calls: keeps them off the event loop, and in order,
+        # since the pipeline's buffer and the SQLite connection are not safe for concurrent use
+        self.io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crawl-io")
+        async with async_playwright() as p:
+            self.pool = BrowserPool(p, headless=self.headless, max_contexts=self.recycle_after,
+                                    max_heap_mb=self.max_heap_mb)
+            if any("http" in (site.fetch_mode, site.detail_fetch_mode) for site in self.sites.values()):
+                self.http = HttpFetcher(max_connections=sum(map(self.limit_for, self.sites.values())) * 4)
+            try:
+                await asyncio.gather(*(self._crawl_site(site) for site in self.sites.values()))
+            finally:
+                await self.pool.close()
+                self.io_executor.shutdown(wait=True)
+                if self.http:
+                    await self.http.close()
+                    self.bytes_fetched += self.http.bytes_fetched
+        self.log_route_stats()
+        logging.info(f"⏱️ Throttle: {self.throttle.stats}")
+        return self.results
+
+    def log_route_stats(self) -> None:
+        for site in self.sites.values():
+            for handler in site.routes:
+                stats = getattr(handler, "stats", None)
+                if stats:
+                    logging.info(f"🚫 {site.name} blocking: {stats}")
+
+    async def run_io(self, fn, *args):
+        """Run a blocking pipeline/checkpoint call on the I/O thread and await its result."""
+        return await asyncio.get_running_loop().run_in_executor(self.io_executor, fn, *args)
+
+    def limit_for(self, site: SiteDefinition) -> int:
+        return max(1, self.concurrency.get(site.name, site.concurrency))
+
+    async def _crawl_site(self, site: SiteDefinition) -> None:
+        if self.work_queue:
+            limit = self.limit_for(site)
+            logging.info(f"🚀 {site.name}: pulling targets from the shared work queue, {limit} concurrent pages.")
+            await asyncio.gather(*(self._queue_worker(site) for _ in range(limit)))
+            return
+
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = 0
+        for target in site.targets():
+            if self.checkpoints:
+                target = await self.run_io(self.checkpoints.resume, target)
+                if target is None:
+                    finished += 1
+                    continue
+            queue.put_nowait(target)
+
+        limit = self.limit_for(site)
+        resumed = f" ({finished} already finished in a previous run)" if finished else ""
+        logging.info(f"🚀 {site.name}: {queue.qsize()} targets{resumed}, {limit} concurrent pages.")
+        workers = [asyncio.create_task(self._worker(site, queue)) for _ in range(limit)]
+
+        await queue.join()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        # A clean run starts over next time; failed targets stay resumable
+        if self.checkpoints and not self.errors[site.name]:
+            await self.run_io(self.checkpoints.reset, site.name)
+
+    async def _worker(self, site: SiteDefinition, queue: asyncio.Queue) -> None:
+        while True:
+            target = await queue.get()
+            try:
+                next_target = await self._process_target(site, target)
+                if self.checkpoints:
+                    await self.run_io(self._checkpoint, target, next_target)
+                if next_target:
+                    queue.put_nowait(next_target)
+            except Exception as e:
+                self.errors[site.name] += 1
+                logging.error(f"❌ {site.name}: failed {target.url}: {e}")
+            finally:
+                queue.task_done()
+
+    async def _queue_worker(self, site: SiteDefinition) -> None:
+        while True:
+            leased = await asyncio.to_thread(self.work_queue.lease, site.name)
+            if leased is None:
+                # Pages leased by other workers may still add their next page
+                if not await asyncio.to_thread(self.work_queue.has_outstanding, site.name):
+                    return
+                await asyncio.sleep(QUEUE_POLL_SECONDS)
+                continue
+
+            task_id, fields = leased
+            target = Target(**fields)
+            try:
+                next_target = await self._process_target(site, target)
+                await self.run_io(self.pipeline.flush)  # results must be in Mongo before the ack
+                if next_target:
+                    await asyncio.to_thread(self.work_queue.enqueue, [next_target])
+                await asyncio.to_thread(self.work_queue.ack, task_id)
+            except Exception as e:
+                self.errors[site.name] += 1
+                logging.error(f"❌ {site.name}: failed {target.url}: {e}")
+                await asyncio.to_thread(self.work_queue.nack, task_id, e)
+
+    def _store_items(self, items: list) -> None:
+        for item in items:
+            self.pipeline.process_item(item)
+            logging.info(pformat(item, sort_dicts=False))
+
+    def _checkpoint(self, target: Target, next_target: Optional[Target]) -> None:
+        # Flush first so a checkpoint never gets ahead of what is actually in Mongo
+        self.pipeline.flush()
+        if next_target:
+            self.checkpoints.save_cursor(next_target)
+        else:
+            self.checkpoints.mark_done(target)
+
+    @asynccontextmanager
+    async def new_context(self, site: SiteDefinition):
+        """Fresh pooled context with the rotating UA and the site's routes attached."""
+        async with self.pool.context(**site.context_options) as context:
+            context.set_default_timeout(60000)
+            await context.route("**/*", self.user_agent_middleware)
+            for handler in site.routes:
+                await context.route("**/*", handler)
+            yield context
+
+    def _count_response(self, response) -> None:
+        # Content-Length is missing on chunked responses, so browser bytes are a lower bound
+        try:
+            self.bytes_fetched += int(response.headers.get("content-length", 0))
+        except ValueError:
+            pass
+
+    async def new_page(self, site: SiteDefinition, context):
+        page = await context.new_page()
+        page.on("response", self._count_response)
+        if site.stealth:
+            await stealth_async(page)
+        return page
+
+    async def goto(self, page, url, site: SiteDefinition):
+        """Throttled navigation that feeds the response latency/status back into the throttle."""
+        await self.throttle.wait(url)
+        started = time.monotonic()
+        try:
+            response = await page.goto(url, wait_until=site.wait_until, timeout=60000)
+        except Exception:
+            self.throttle.record(url, time.monotonic() - started, status=None)
+            raise
+        status = response.status if response else 200
+        retry_after = parse_retry_after(response.headers.get("retry-after")) if response else None
+        self.throttle.record(url, time.monotonic() - started, status, retry_after)
+        if response and not response.ok:
+            raise RuntimeError(f"HTTP {status}")
+        return response
+
+    async def fetch_html(self, url) -> HtmlPage:
+        """Throttled plain HTTP GET, parsed into an `HtmlPage`."""
+        await self.throttle.wait(url)
+        started = time.monotonic()
+        try:
+            response = await self.http.get(url)
+        except Exception:
+            self.throttle.record(url, time.monotonic() - started, status=None)
+            raise
+        retry_after = parse_retry_after(response.headers.get("retry-after"))
+        self.throttle.record(url, time.monotonic() - started, response.status_code, retry_after)
+        response.raise_for_status()
+        return HtmlPage(str(response.url), response.text)
+
+    async def _parse_over_http(self, site: SiteDefinition, target: Target) -> Optional[PageResult]:
+        page = await self.fetch_html(target.url)
+        if site.ready_selector and not page.has(site.ready_selector):
+            logging.info(f"↪️ {target.url} needs JS rendering, falling back to the browser.")
+            return None
+        return await site.parse(page, target, self)
+
+    async def _process_target(self, site: SiteDefinition, target: Target) -> Optional[Target]:
+        logging.info(f"📄 {site.name}: {target.city} - {target.category} - page {target.page}")
+        result = await self._parse_over_http(site, target) if site.fetch_mode == "http" else None
+        if result is None:
+            async with self.new_context(site) as context:
+                page = await self.new_page(site, context)
+                await self.goto(page, target.url, site)
+                if site.ready_selector:
+                    await page.wait_for_selector(site.ready_selector, timeout=30000)
+                result = await site.parse(page, target, self)
+
+        await self.run_io(self._store_items, result.items)
+        self.results[site.name].extend(result.items)
+
+        if not result.next_url:
+            return None
+        if target.page >= site.max_pages:
+            logging.info(f"🛑 Max page limit reached for {target.city} - {target.category}.")
+            return None
+        return target.next_page(result.next_url)
+
+    async def extract_cards(self, page, target: Target) -> list:
+        """All listing cards on a results page as dicts, using the site's declared field map."""
+        site = self.sites[target.site]
+        if isinstance(page, HtmlPage):
+            return extraction.extract_cards_from_html(page, site.card_selector, site.card_fields)
+        return await extraction.extract_cards(page, site.card_selector, site.card_fields)
+
+    async def fetch_details(self, page, target: Target, urls, parse_detail) -> list:
+        """
+        Visit detail `urls` with bounded fan-out, leaving the results page loaded: over HTTP,
+        or on a small pool of extra tabs in the results page's context. `parse_detail(detail_page,
+        target, url)` runs on each; results come back in the order of `urls`, failed pages dropped.
+        """
+        if not urls:
+            return []
+        site = self.sites[target.site]
+        results = [None] * len(urls)
+        queue: asyncio.Queue = asyncio.Queue()
+        for index, url in enumerate(urls):
+            queue.put_nowait((index, url))
+
+        async def drain(load):
+            while not queue.empty():
+                index, url = queue.get_nowait()
+                try:
+                    results[index] = await parse_detail(await load(url), target, url)
+                except Exception as e:
+                    logging.error(f"❌ Error scraping a listing {url}: {e}")
+
+        workers = min(max(1, site.detail_concurrency), len(urls))
+        if site.detail_fetch_mode == "http":
+            await asyncio.gather(*(drain(self.fetch_html) for _ in range(workers)))
+        elif isinstance(page, HtmlPage):
+            async with self.new_context(site) as context:
+                await self._drain_on_tabs(site, context, drain, workers)
+        else:
+            await self._drain_on_tabs(site, page.context, drain, workers)
+        return [result for result in results if result is not None]
+
+    async def _drain_on_tabs(self, site: SiteDefinition, context, drain, tabs: int) -> None:
+        async def tab_worker():
+            detail_page = await self.new_page(site, context)
+
+            async def load(url):
+                await self.goto(detail_page, url, site)
+                return detail_page
+
+            try:
+                await drain(load)
+            finally:
+                await detail_page.close()
+
+        await asyncio.gather(*(tab_worker() for _ in range(tabs)))
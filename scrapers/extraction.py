@@ -0,0 +1,107 @@
+import re
+
+import lxml.html
+
+# A field spec is a CSS selector relative to the card, optionally suffixed with
+# "@attr" to read an attribute instead of the text: {"title": "h4", "link": "h2 > a@href"}.
+# An empty selector ("@data-id") reads from the card element itself.
+_ATTR_SUFFIX = re.compile(r"@([\w:-]+)$")
+
+_EXTRACT_CARDS_JS = """
+(cards, fields) => cards.map(card => {
+    const row = {};
+    for (const [name, selector, attr] of fields) {
+        const el = selector ? card.querySelector(selector) : card;
+        const value = !el ? null : (attr ? el.getAttribute(attr) : el.innerText);
+        // Same normalization as _text() on the lxml path, so both fetch modes hash alike
+        row[name] = value == null ? null : value.replace(/[\\s\\u00a0]+/g, " ").trim();
+    }
+    return row;
+})
+"""
+
+
+def parse_field_spec(spec: str):
+    """Split "selector@attr" into (selector, attr); attr is None for text fields."""
+    match = _ATTR_SUFFIX.search(spec)
+    if not match:
+        return spec.strip(), None
+    return spec[:match.start()].strip(), match.group(1)
+
+
+def compile_fields(fields: dict) -> list:
+    return [[name, *parse_field_spec(spec)] for name, spec in fields.items()]
+
+
+def fill_defaults(rows: list, default="N/A") -> list:
+    return [{k: (v if v not in (None, "") else default) for k, v in row.items()} for row in rows]
+
+
+async def extract_cards(page, card_selector: str, fields: dict, default="N/A") -> list:
+    """Extract every card on the page in a single browser round-trip."""
+    rows = await page.eval_on_selector_all(card_selector, _EXTRACT_CARDS_JS, compile_fields(fields))
+    return fill_defaults(rows, default)
+
+
+# ---------------------------- Raw HTML (HTTP fast path) ----------------------------
+
+def _collapse(value: str) -> str:
+    return " ".join(value.replace("\xa0", " ").split())
+
+
+def _text(node) -> str:
+    return _collapse(node.text_content())
+
+
+class HtmlElement:
+    """lxml element exposing the async subset of Playwright's ElementHandle the scrapers use."""
+
+    def __init__(self, node):
+        self.node = node
+
+    async def inner_text(self) -> str:
+        return _text(self.node)
+
+    async def get_attribute(self, attr):
+        return self.node.get(attr)
+
+    async def query_selector(self, selector):
+        found = self.node.cssselect(selector)
+        return HtmlElement(found[0]) if found else None
+
+    async def query_selector_all(self, selector):
+        return [HtmlElement(node) for node in self.node.cssselect(selector)]
+
+
+class HtmlPage(HtmlElement):
+    """A server-rendered page fetched over HTTP, parsed with lxml instead of rendered in Chromium."""
+
+    def __init__(self, url: str, html: str):
+        super().__init__(lxml.html.fromstring(html or "<html></html>", base_url=url))
+        self.url = url
+        self.html = html
+
+    async def content(self) -> str:
+        return self.html
+
+    def has(self, selector: str) -> bool:
+        return bool(self.node.cssselect(selector))
+
+
+def extract_cards_from_html(page: HtmlPage, card_selector: str, fields: dict, default="N/A") -> list:
+    """Same output as `extract_cards`, computed from raw HTML."""
+    compiled = compile_fields(fields)
+    rows = []
+    for card in page.node.cssselect(card_selector):
+        row = {}
+        for name, selector, attr in compiled:
+            found = card.cssselect(selector) if selector else [card]
+            if not found:
+                row[name] = None
+            elif attr:
+                value = found[0].get(attr)
+                row[name] = _collapse(value) if value is not None else None
+            else:
+                row[name] = _text(found[0])
+        rows.append(row)
+    return fill_defaults(rows, default)
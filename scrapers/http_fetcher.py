@@ -0,0 +1,37 @@
+import random
+import logging
+
+import httpx
+
+from middlewares.user_agent_middleware import RotatingUserAgentMiddleware
+
+
+class HttpFetcher:
+    """
+    Pooled keep-alive HTTP client for pages that don't need JS rendering.
+    Every request gets a user agent from `RotatingUserAgentMiddleware`'s list.
+    """
+
+    def __init__(self, max_connections=20, timeout=30.0, user_agents=None):
+        self.user_agents = user_agents or RotatingUserAgentMiddleware().user_agents
+        self.client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            headers={
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "en-US,en;q=0.9",
+            },
+        )
+        self.requests = 0
+        self.bytes_fetched = 0
+
+    async def get(self, url) -> httpx.Response:
+        response = await self.client.get(url, headers={"User-Agent": random.choice(self.user_agents)})
+        self.requests += 1
+        self.bytes_fetched += len(response.content)
+        return response
+
+    async def close(self) -> None:
+        await self.client.aclose()
+        logging.info(f"🌐 HTTP fast path: {self.requests} requests, {self.bytes_fetched / 1_048_576:.1f} MB.")
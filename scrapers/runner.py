@@ -0,0 +1,100 @@
+import time
+import logging
+
+from pipelines.checkpoint_store import CheckpointStore
+from pipelines.mongodb_pipeline import MongoPipeline
+from pipelines.mongo_work_queue import MongoWorkQueue
+from pipelines.rollups import PriceRollups
+from pipelines.facets import FacetSummary
+from scrapers.crawl_engine import CrawlEngine
+from utils.sheet_writer import sync_properties
+
+
+def enqueue_site(site, fresh=True) -> int:
+    """Producer side of queue mode: push the site's targets into the shared work queue."""
+    work_queue = MongoWorkQueue()
+    work_queue.open()
+    try:
+        if fresh:
+            work_queue.purge(site.name, statuses=("done", "failed"))
+        added = work_queue.enqueue(site.targets())
+        logging.info(f"📥 Enqueued {added} targets for {site.name}: {work_queue.counts(site.name)}")
+        return added
+    finally:
+        work_queue.close()
+
+
+def run_site(site, write_sheet=True, keep_listings=False, resume=True, fresh=False, from_queue=False,
+             **engine_options) -> dict:
+    """
+    Crawl one site end to end (Mongo, engine, Google Sheet) and return its run report:
+    item/error counts, duration, bytes fetched and the pipeline's write stats.
+    With `keep_listings`, the report also carries the scraped listings so a parent process
+    can sync them with `sync_sheets` instead (pass `write_sheet=False` then).
+    With `resume`, targets finished by an interrupted earlier run are skipped;
+    `fresh` discards that progress first. With `from_queue`, targets are pulled
+    from the shared `MongoWorkQueue` instead (see `enqueue_site`).
+    """
+    started = time.monotonic()
+    rollups = PriceRollups()
+    rollups.open()
+    facets = FacetSummary()
+    facets.open()
+    pipeline = MongoPipeline(buffered=True, incremental=True, rollups=rollups, facets=facets)
+    pipeline.open()
+
+    work_queue = None
+    if from_queue:
+        work_queue = MongoWorkQueue()
+        work_queue.open()
+        resume = False  # the queue already tracks what is done
+
+    checkpoints = None
+    if resume:
+        checkpoints = CheckpointStore()
+        checkpoints.open()
+        if fresh:
+            checkpoints.reset(site.name)
+
+    engine = CrawlEngine([site], pipeline, checkpoints=checkpoints, work_queue=work_queue, **engine_options)
+    try:
+        listings = engine.run()[site.name]
+    finally:
+        pipeline.close()  # final flush, then refreshes the rollups this run touched
+        rollups.close()
+        facets.close()
+        if checkpoints:
+            checkpoints.close()
+        if work_queue:
+            work_queue.close()
+
+    if write_sheet:
+        sync_properties(listings, website=site.website)
+
+    report = {
+        "site": site.name,
+        "website": site.website,
+        "items": len(listings),
+        "errors": engine.errors[site.name],
+        "duration_s": round(time.monotonic() - started, 1),
+        "bytes_fetched": engine.bytes_fetched,
+        "pipeline": dict(pipeline.stats),
+    }
+    logging.info(f"✅ Scraping complete for {site.name}: {report}")
+    if keep_listings:
+        report["listings"] = listings
+    return report
+
+
+def sync_sheets(reports) -> None:
+    """
+    Sync the listings `run_site(..., keep_listings=True)` returned, one website at a time.
+    `sync_properties` edits rows by number from a single read of the sheet, so two syncs
+    must never overlap; crawlers sharing a website are merged into one sync.
+    """
+    by_website = {}
+    for report in reports:
+        if "listings" in report:
+            by_website.setdefault(report["website"], []).extend(report.pop("listings"))
+    for website, listings in by_website.items():
+        sync_properties(listings, website=website)
@@ -0,0 +1,18 @@
+from pathlib import Path
+
+import pytest
+
+from pipelines.mongodb_pipeline import normalize_facet
+
+
+@pytest.fixture
+def server_normalize_facet(monkeypatch):
+    # The web app runs from WebApp/ and keeps its own copy of the helper
+    monkeypatch.syspath_prepend(str(Path(__file__).resolve().parents[1] / "WebApp"))
+    server = pytest.importorskip("server")
+    return server.normalize_facet
+
+
+@pytest.mark.parametrize("value", ["Lagos", "  lekki PHASE 1 ", "ABUJA\n", "", None, 3, "Ìkẹjà"])
+def test_web_app_filters_normalize_like_the_pipeline(server_normalize_facet, value):
+    assert server_normalize_facet(value) == normalize_facet(value)
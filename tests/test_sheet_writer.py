@@ -0,0 +1,117 @@
+import re
+
+import pytest
+
+from utils import sheet_writer
+from utils.sheet_writer import LISTING_HEADER, build_url_index, sync_properties
+from utils.sheets_write_queue import SheetsWriteQueue
+
+
+class FakeSpreadsheet:
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+        self.requests = []
+
+    def batch_update(self, body):
+        for request in body["requests"]:
+            span = request["deleteDimension"]["range"]
+            self.requests.append((span["startIndex"], span["endIndex"]))
+            del self.worksheet.rows[span["startIndex"]:span["endIndex"]]
+
+
+class FakeWorksheet:
+    """Just enough of gspread's Worksheet for `sync_properties`; every cell reads back as a string."""
+
+    id = 0
+
+    def __init__(self, rows):
+        self.rows = [list(row) for row in rows]
+        self.spreadsheet = FakeSpreadsheet(self)
+        self.updated_rows = []
+        self.value_input_options = set()
+
+    def get_all_values(self):
+        return [[str(cell) for cell in row] for row in self.rows]
+
+    def update(self, range_name, values):
+        self.rows[:len(values)] = [list(row) for row in values]
+
+    def batch_update(self, data, value_input_option=None):
+        self.value_input_options.add(value_input_option)
+        for entry in data:
+            row_number = int(re.match(r"A(\d+):", entry["range"]).group(1))
+            self.rows[row_number - 1] = list(entry["values"][0])
+            self.updated_rows.append(row_number)
+
+    def append_rows(self, rows, value_input_option=None):
+        self.value_input_options.add(value_input_option)
+        self.rows.extend(list(row) for row in rows)
+
+
+def listing(url, website="example.com", price="₦ 1,000,000", phone="08031234567"):
+    return {"website": website, "category": "Flat", "city": "Lagos", "title": f"Listing {url}",
+            "price": price, "price_int": 1000000, "location": "Lekki", "bedrooms": "3",
+            "bathrooms": "3", "toilets": "4", "agent_name": "Agent", "phone": phone,
+            "agent_whatsapp": phone, "image_url": "", "url": url}
+
+
+def row(url, website="example.com", **fields):
+    return sheet_writer._normalize_row(sheet_writer._dict_to_row(listing(url, website, **fields)))
+
+
+@pytest.fixture
+def sheet(monkeypatch):
+    worksheet = FakeWorksheet([LISTING_HEADER])
+    monkeypatch.setattr(sheet_writer, "SHEETS_ENABLED", True)
+    monkeypatch.setattr(sheet_writer, "get_sheet", lambda: worksheet)
+    monkeypatch.setattr(sheet_writer, "write_queue", SheetsWriteQueue(requests_per_minute=600000))
+    return worksheet
+
+
+def urls(worksheet):
+    return [(r[0], r[sheet_writer.URL_COL]) for r in worksheet.rows[1:]]
+
+
+def test_build_url_index_skips_other_websites_and_collects_duplicates():
+    all_rows = [LISTING_HEADER, row("a"), row("x", website="other.com"), row("b"), row("a"), row("")]
+    index, extra_rows = build_url_index(all_rows, "example.com")
+    assert index == {"a": 2, "b": 4}
+    assert extra_rows == [5, 6]
+
+
+def test_sync_leaves_unchanged_rows_alone(sheet):
+    sheet.rows += [row("a"), row("b")]
+    summary = sync_properties([listing("a"), listing("b")], website="example.com")
+    assert summary["unchanged"] == 2
+    assert sheet.updated_rows == []
+
+
+def test_sync_updates_changed_rows_in_place_and_writes_raw(sheet):
+    sheet.rows += [row("a"), row("x", website="other.com"), row("b")]
+    summary = sync_properties([listing("a"), listing("b", price="₦ 2,000,000")], website="example.com")
+    assert summary["updated"] == 1
+    assert sheet.updated_rows == [4]
+    assert sheet.rows[3] == row("b", price="₦ 2,000,000")
+    assert sheet.value_input_options == {"RAW"}
+
+
+def test_sync_reuses_stale_rows_before_appending(sheet):
+    sheet.rows += [row("a"), row("a"), row("x", website="other.com"), row("")]
+    summary = sync_properties([listing("a"), listing("b"), listing("c"), listing("d")], website="example.com")
+    assert summary["inserted"] == 3 and summary["deleted"] == 0
+    assert urls(sheet) == [("example.com", "a"), ("example.com", "b"), ("other.com", "x"),
+                           ("example.com", "c"), ("example.com", "d")]
+
+
+def test_sync_prune_deletes_only_this_websites_missing_rows(sheet):
+    sheet.rows += [row("a"), row("gone1"), row("x", website="other.com"), row("gone2"), row("gone3"), row("b")]
+    summary = sync_properties([listing("a"), listing("b")], website="example.com", prune=True)
+    assert summary["deleted"] == 3
+    assert urls(sheet) == [("example.com", "a"), ("other.com", "x"), ("example.com", "b")]
+
+
+def test_delete_rows_merges_contiguous_blocks_bottom_up(sheet):
+    sheet.rows += [row(str(n)) for n in range(2, 11)]  # sheet row n holds url "n"
+    sheet_writer._delete_rows([9, 3, 4, 10, 5, 7, 4])
+    assert sheet.spreadsheet.requests == [(8, 10), (6, 7), (2, 5)]
+    assert [url for _, url in urls(sheet)] == ["2", "6", "8"]
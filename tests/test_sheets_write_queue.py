@@ -0,0 +1,34 @@
+import json
+
+import requests
+from gspread.exceptions import APIError
+
+from utils import sheets_write_queue
+from utils.sheets_write_queue import SheetsWriteQueue, error_status
+
+
+def api_error(status):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps({"error": {"code": status, "message": "Quota exceeded", "status": "RESOURCE_EXHAUSTED"}}).encode()
+    return APIError(response)
+
+
+def test_error_status_reads_falsy_requests_response():
+    assert error_status(api_error(429)) == 429
+
+
+def test_call_retries_gspread_429(monkeypatch):
+    monkeypatch.setattr(sheets_write_queue.time, "sleep", lambda seconds: None)
+    queue = SheetsWriteQueue(requests_per_minute=6000)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise api_error(429)
+        return "ok"
+
+    assert queue.call(flaky) == "ok"
+    assert len(attempts) == 3
+    assert queue.stats["retries"] == 2
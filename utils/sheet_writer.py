@@ -1,25 +1,56 @@
-# -------------------------------- Google Sheets setup (unchanged) -------------------------------
+# -------------------------------- Google Sheets setup (lazy) ------------------------------------
 import gspread
+from gspread.utils import rowcol_to_a1
 from oauth2client.service_account import ServiceAccountCredentials
+from utils.sheets_write_queue import SheetsWriteQueue
 import os
 
 
 KEY_FILE = os.getenv("GOOGLE_SERVICE_KEY", "utils/propertyAPIkeys.json")
 SHEET_NAME = "PropertyBotListings"
 
+# Scrape-only runs: set SHEETS_ENABLED=0 (or call `disable_sheets()`) to never touch Google
+SHEETS_ENABLED = os.getenv("SHEETS_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+
 scope  = ["https://spreadsheets.google.com/feeds",
           "https://www.googleapis.com/auth/drive"]
 
-if not os.path.exists(KEY_FILE):
-    raise FileNotFoundError(f"❌ Google API key file not found at: {KEY_FILE}")
+# Every write goes through this queue: chunked, paced under the per-minute quota, retried on 429/5xx
+write_queue = SheetsWriteQueue(
+    chunk_size=int(os.getenv("SHEETS_CHUNK_ROWS", "500")),
+    requests_per_minute=int(os.getenv("SHEETS_WRITES_PER_MINUTE", "50")),
+)
+
+_sheet = None
+
+
+def disable_sheets() -> None:
+    global SHEETS_ENABLED
+    SHEETS_ENABLED = False
+
+
+def get_sheet():
+    """
+    Authenticate and open the worksheet on first use, then reuse it.
+    gspread's authorized session refreshes the service-account token by itself.
+    """
+    global _sheet
+    if not SHEETS_ENABLED:
+        raise RuntimeError("❌ Google Sheets is disabled (SHEETS_ENABLED=0).")
+
+    if _sheet is not None:
+        return _sheet
 
+    if not os.path.exists(KEY_FILE):
+        raise FileNotFoundError(f"❌ Google API key file not found at: {KEY_FILE}")
 
-try:
-    creds  = ServiceAccountCredentials.from_json_keyfile_name(KEY_FILE, scope)
-    client = gspread.authorize(creds)
-    sheet  = client.open(SHEET_NAME).sheet1
-except Exception as e:
-    raise RuntimeError(f"❌ Failed to authenticate with Google Sheets: {e}")
+    try:
+        creds = ServiceAccountCredentials.from_json_keyfile_name(KEY_FILE, scope)
+        client = gspread.authorize(creds)
+        _sheet = client.open(SHEET_NAME).sheet1
+    except Exception as e:
+        raise RuntimeError(f"❌ Failed to authenticate with Google Sheets: {e}")
+    return _sheet
 
 
 # -------------------------------- Listing helpers -----------------------------------------------
@@ -38,7 +69,7 @@ def load_existing_urls(col: int = 15) -> None:
     """Fetch the URL column once and cache as `existing_urls`."""
     global existing_urls
     try:
-        urls = sheet.col_values(col)
+        urls = get_sheet().col_values(col)
         existing_urls = set(urls[1:])      # skip header
     except Exception as e:
         print(f"⚠️  Error loading existing URLs: {e}")
@@ -46,6 +77,7 @@ def load_existing_urls(col: int = 15) -> None:
 
 def _ensure_min_rows(min_rows: int = 2) -> None:
     """Ensure the worksheet grid has at least `min_rows` rows."""
+    sheet = get_sheet()
     current = sheet.row_count
     if current < min_rows:
         sheet.add_rows(min_rows - current)
@@ -54,6 +86,7 @@ def clear_sheet() -> None:
     """Clear everything below the header without shrinking the grid."""
     try:
         _ensure_min_rows(2)                      # ✅ Ensure at least 2 rows
+        sheet = get_sheet()
         sheet.batch_clear(['A2:Z'])              # ✅ Clear below header
         sheet.update("A1", [LISTING_HEADER])
         print("🧹 Sheet cleared, header row reset.")
@@ -82,6 +115,7 @@ def _dict_to_row(d: dict) -> list:
 
 def clear_rows_by_website(website: str) -> None:
     try:
+        sheet = get_sheet()
         all_rows = sheet.get_all_values()
         header = all_rows[0]
         rows = all_rows[1:]
@@ -111,6 +145,11 @@ def write_properties(listings: list[dict],
     """
     global existing_urls
 
+    if not SHEETS_ENABLED:
+        print(f"ℹ️  Sheets disabled, skipping export for '{website}'.")
+        return
+    write_queue.reset_stats()
+
     # ✅ Tag each listing with the website source
     for listing in listings:
         listing["website"] = website
@@ -135,16 +174,138 @@ def write_properties(listings: list[dict],
         print(f"ℹ️  No new listings to add for '{website}'.")
         return
 
-    # ✅ Insert new rows to the sheet
+    # ✅ Insert new rows to the sheet, in quota-friendly chunks
     try:
+        sheet = get_sheet()
         if prepend:
-            # Insert below header (row 2), newest at top
-            sheet.insert_rows(list(reversed(new_rows)), row=2,
-                              value_input_option="USER_ENTERED")
-            print(f"✅ Inserted {len(new_rows)} new listings for '{website}' at the top.")
+            # Insert below header (row 2), newest at top; last chunk first so the order survives
+            chunks = write_queue.chunks(list(reversed(new_rows)))
+            for chunk in reversed(chunks):
+                write_queue.write_rows(chunk, lambda c: sheet.insert_rows(c, row=2, value_input_option="USER_ENTERED"))
+            print(f"✅ Inserted {len(new_rows)} new listings for '{website}' at the top. {write_queue.report()}")
         else:
             # Append to bottom
-            sheet.append_rows(new_rows, value_input_option="USER_ENTERED")
-            print(f"✅ Appended {len(new_rows)} new listings for '{website}' at the bottom.")
+            write_queue.write_rows(new_rows, lambda c: sheet.append_rows(c, value_input_option="USER_ENTERED"))
+            print(f"✅ Appended {len(new_rows)} new listings for '{website}' at the bottom. {write_queue.report()}")
+    except Exception as e:
+        print(f"❌ Error inserting rows for '{website}' after {write_queue.stats['rows']} rows: {e}")
+
+
+# -------------------------------- Incremental sync ----------------------------------------------
+URL_COL = LISTING_HEADER.index("Listing URL")
+LAST_COL = rowcol_to_a1(1, len(LISTING_HEADER)).rstrip("1")
+
+# Synced rows are stored exactly as sent, so reading them back compares equal to `_normalize_row`;
+# USER_ENTERED would parse a phone like "08031234567" into the number 8031234567
+SYNC_VALUE_INPUT = "RAW"
+
+
+def _normalize_row(row: list) -> list:
+    """Pad/trim to the header width and stringify, the way `get_all_values()` reports cells."""
+    row = [("" if v is None else str(v)) for v in row][:len(LISTING_HEADER)]
+    return row + [""] * (len(LISTING_HEADER) - len(row))
+
+
+def build_url_index(all_rows: list[list], website: str) -> tuple[dict, list]:
+    """Map each of `website`'s listing URLs to its 1-based sheet row; also return duplicate/blank rows."""
+    index, extra_rows = {}, []
+    for row_number, row in enumerate(all_rows[1:], start=2):
+        if not row or row[0] != website:
+            continue
+        url = row[URL_COL] if len(row) > URL_COL else ""
+        if url and url not in index:
+            index[url] = row_number
+        else:
+            extra_rows.append(row_number)
+    return index, extra_rows
+
+
+def _update_rows(updates: list[tuple[int, list]]) -> None:
+    sheet = get_sheet()
+    write_queue.write_rows(updates, lambda chunk: sheet.batch_update(
+        [{"range": f"A{n}:{LAST_COL}{n}", "values": [row]} for n, row in chunk],
+        value_input_option=SYNC_VALUE_INPUT,
+    ))
+
+
+def _delete_rows(row_numbers: list[int]) -> None:
+    """Delete rows bottom-up in contiguous blocks so earlier indexes stay valid."""
+    sheet = get_sheet()
+    blocks: list[list[int]] = []
+    for n in sorted(set(row_numbers), reverse=True):
+        if blocks and blocks[-1][0] == n + 1:
+            blocks[-1][0] = n
+        else:
+            blocks.append([n, n])
+    requests = [
+        {"deleteDimension": {"range": {"sheetId": sheet.id, "dimension": "ROWS",
+                                       "startIndex": start - 1, "endIndex": end}}}
+        for start, end in blocks
+    ]
+    for chunk in write_queue.chunks(requests):
+        write_queue.call(sheet.spreadsheet.batch_update, {"requests": chunk})
+
+
+def sync_properties(listings: list[dict], website: str, prune: bool = False) -> dict:
+    """
+    Diff `listings` against the sheet and apply only the changes.
+
+    ▸ One read builds a URL→row index for `website`'s rows; other websites are untouched.
+    ▸ Changed rows are updated in place, new listings first take over freed rows, then append.
+    ▸ `prune` – also delete this website's rows whose URL is not in `listings` (use only for
+      complete crawls; partial runs skip known listings and would otherwise drop them).
+    ▸ Rows are addressed by number from that one read, so never run two syncs against the
+      sheet at once (parallel scrapers hand their listings to `scrapers.runner.sync_sheets`).
+    """
+    for listing in listings:
+        listing["website"] = website
+
+    if not SHEETS_ENABLED:
+        print(f"ℹ️  Sheets disabled, skipping sync for '{website}'.")
+        return {}
+    write_queue.reset_stats()
+
+    try:
+        sheet = get_sheet()
+        all_rows = sheet.get_all_values()
+        if not all_rows:
+            sheet.update("A1", [LISTING_HEADER])
+            all_rows = [LISTING_HEADER]
+
+        index, stale = build_url_index(all_rows, website)
+
+        wanted: dict[str, list] = {}
+        for listing in listings:
+            url = listing.get("url", "")
+            if url:
+                wanted[url] = _normalize_row(_dict_to_row(listing))
+
+        updates, inserts = [], []
+        for url, row in wanted.items():
+            row_number = index.get(url)
+            if row_number is None:
+                inserts.append(row)
+            elif row != _normalize_row(all_rows[row_number - 1]):
+                updates.append((row_number, row))
+
+        if prune:
+            stale += [n for url, n in index.items() if url not in wanted]
+        stale.sort()
+
+        # Reuse rows we'd delete anyway, so inserts don't shift anything
+        reused = list(zip(stale, inserts))
+        stale, inserts = stale[len(reused):], inserts[len(reused):]
+
+        _update_rows(updates + reused)
+        write_queue.write_rows(inserts, lambda chunk: sheet.append_rows(chunk, value_input_option=SYNC_VALUE_INPUT))
+        if stale:
+            _delete_rows(stale)
+
+        summary = {"inserted": len(inserts) + len(reused), "updated": len(updates),
+                   "deleted": len(stale), "unchanged": len(wanted) - len(updates) - len(inserts) - len(reused),
+                   **write_queue.report()}
+        print(f"✅ Synced '{website}' to sheet: {summary}")
+        return summary
     except Exception as e:
-        print(f"❌ Error inserting rows for '{website}': {e}")
+        print(f"❌ Error syncing rows for '{website}': {e}")
+        return {}
@@ -0,0 +1,107 @@
+import time
+import random
+import threading
+
+# Google Sheets: 429 = per-minute quota exhausted, 5xx = transient backend trouble
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Allows `rate_per_minute` calls per minute on average, with bursts up to `capacity`."""
+
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(1.0, rate_per_minute / 6)  # ~10 s worth of burst
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available; returns the time waited."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                pause = (1 - self.tokens) / self.rate
+            time.sleep(pause)
+            waited += pause
+
+
+def error_status(error):
+    """HTTP status of a gspread/googleapiclient error, if it carries one."""
+    # A non-2xx requests.Response is falsy, so test for None rather than truthiness
+    response = getattr(error, "response", None)
+    if response is None:
+        response = getattr(error, "resp", None)
+    status = getattr(response, "status_code", None) or getattr(response, "status", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class SheetsWriteQueue:
+    """
+    Paces Sheets API writes under the per-minute quota and retries 429/5xx with
+    exponential backoff (plus jitter), so big exports slow down instead of failing.
+
+    ▸ `chunk_size` – rows per request when a batch of rows is written with `write_rows`.
+    ▸ `requests_per_minute` – token-bucket rate shared by every call made through the queue.
+    ▸ `max_retries` / `base_delay` / `max_delay` – backoff schedule for retryable errors.
+    """
+
+    def __init__(self, chunk_size=500, requests_per_minute=50, max_retries=6, base_delay=2.0, max_delay=64.0):
+        self.chunk_size = chunk_size
+        self.bucket = TokenBucket(requests_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.stats = {"calls": 0, "rows": 0, "retries": 0, "throttled_s": 0.0, "started": time.monotonic()}
+
+    def call(self, fn, *args, **kwargs):
+        """Run one API request under the rate limit, retrying transient failures."""
+        attempt = 0
+        while True:
+            self.stats["throttled_s"] += self.bucket.acquire()
+            try:
+                result = fn(*args, **kwargs)
+                self.stats["calls"] += 1
+                return result
+            except Exception as e:
+                status = error_status(e)
+                retryable = status in RETRYABLE_STATUSES or isinstance(e, (ConnectionError, TimeoutError))
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.8, 1.2)
+                attempt += 1
+                self.stats["retries"] += 1
+                print(f"⏳ Sheets API {status or type(e).__name__}, retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def chunks(self, rows: list) -> list:
+        return [rows[i:i + self.chunk_size] for i in range(0, len(rows), self.chunk_size)]
+
+    def write_rows(self, rows: list, write_chunk) -> None:
+        """Send `rows` as `write_chunk(chunk)` requests of at most `chunk_size` rows each."""
+        for chunk in self.chunks(rows):
+            self.call(write_chunk, chunk)
+            self.stats["rows"] += len(chunk)
+
+    def report(self) -> dict:
+        elapsed = max(time.monotonic() - self.stats["started"], 1e-9)
+        return {
+            "rows": self.stats["rows"],
+            "calls": self.stats["calls"],
+            "retries": self.stats["retries"],
+            "throttled_s": round(self.stats["throttled_s"], 1),
+            "elapsed_s": round(elapsed, 1),
+            "rows_per_s": round(self.stats["rows"] / elapsed, 1),
+        }